@@ -1,11 +1,41 @@
+import os
+import sys
 import socket
 import json
 import threading
 import time
 import traceback
 import queue
+import cProfile
+from bisect import bisect_left
+from collections import deque
 import dearpygui.dearpygui as dpg
 
+# Shared helpers (outgauge_*.py) live next to outgauge_dashboard.py, two
+# folders up. They're optional so this file still runs on its own.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+try:
+    from outgauge_jitter import JitterBank
+except ImportError:
+    JitterBank = None
+try:
+    from outgauge_stats import SessionStats
+except ImportError:
+    SessionStats = None
+try:
+    import numpy as np
+    import outgauge_derived
+except ImportError:
+    outgauge_derived = None
+try:
+    from outgauge_reference import ReferenceRun
+except ImportError:
+    ReferenceRun = None
+try:
+    from outgauge_sinks import SinkSet
+except ImportError:
+    SinkSet = None
+
 BIND_ADDR_UDP = "0.0.0.0"
 JSON_PORT = 9998
 
@@ -17,6 +47,27 @@ UI_DT = 1.0 / UI_HZ
 
 MAX_POINTS = 999999
 
+JITTER_LATENCY_MS = 100.0   # added delay when the jitter buffer is on
+
+# output sinks (outgauge_sinks.py): frames are also written to these, each on
+# its own thread, e.g. {"type": "ndjson", "path": "erinsmod_%Y%m%d_%H%M%S.ndjson"}
+SINKS = []
+
+# derived channels (needs numpy + outgauge_derived.py)
+DERIVED_CONTEXT_S = 10.0    # history re-read around new samples each update
+DERIVED_REDO = 4            # trailing points recomputed (the last one can still change)
+DERIVED_PLOTTED = ("g_long", "wheelspin_pct")
+
+# reference run overlay (outgauge_reference.py)
+REF_PLOTTED = ("speed_kmh", "rpm")
+
+# frame profiler (opt-in from the UI)
+PROFILE_WINDOW = 600        # frames kept per phase for rolling percentiles
+PROFILE_UI_DT = 0.5         # overlay refresh period
+PROFILE_CAPTURE_S = 10.0    # length of a cProfile capture
+
+PROFILE_PHASES = ("layout", "drain", "axis_limits", "derived", "reference", "set_value", "status", "render", "frame")
+
 start_time = time.time()
 
 scroll_ready = False
@@ -24,8 +75,47 @@ scroll_active = True
 scroll_time = 0.0
 
 _last_store_t = None
+_dist_prev = None           # (t, km/h, dist) the newest point's distance is integrated from
+_dist_last = None           # (t, km/h, dist) of the newest point
 _last_plot_push = 0.0
 
+jitter_active = False
+jitter = None
+
+sinks = SinkSet.from_specs(SINKS) if SinkSet is not None and SINKS else None
+
+derived_active = False
+_derived_upto = 0
+gear_refs = outgauge_derived.GearRefs() if outgauge_derived is not None else None
+_refs_upto = 0              # history points counted into gear_refs
+
+_export_request = False
+_save_run_request = False
+_csv_job = None             # worker thread writing the last Export CSV / Save Run file
+_ref_from_run_request = False
+_run_start_request = False
+_ref_pending = None         # (ReferenceRun or None, message) from Load/Clear, applied by _run_tick()
+
+reference = None            # ReferenceRun being compared against
+run_t0 = None               # live run origin: history t and dist at "Start Run"
+run_d0 = 0.0
+_ref_upto = 0
+
+session_stats = SessionStats() if SessionStats is not None else None
+STATS_UI_DT = 0.5
+_last_stats_push = 0.0
+
+profile_active = False
+_prof_pending = None        # checkbox state, applied at the next _prof_begin()
+_prof_samples = {p: deque(maxlen=PROFILE_WINDOW) for p in PROFILE_PHASES}
+_prof_t0 = 0.0
+_prof_frame_t0 = 0.0
+_last_prof_push = 0.0
+_cprof = None
+_cprof_until = 0.0
+_cprof_request = False
+_cprof_last_file = ""
+
 sample_q = queue.Queue()
 
 history = {
@@ -37,8 +127,18 @@ history = {
     "throttle": [],
     "brake": [],
     "clutch": [],
+    "gear": [],
+    "limiter": [],
+    "dist": [],             # m, integrated from speed; never decreases
 }
 
+# derived channels, index-aligned with history["t"] up to _derived_upto
+derived_hist = {name: [] for name in DERIVED_PLOTTED}
+derived_events = {"shift_t": [], "shift_g": [], "limiter_t": [], "limiter_rpm": []}
+
+# reference values at the live run's distance, for history points since run_t0
+ref_hist = {"t": [], **{name: [] for name in REF_PLOTTED}}
+
 meta = {
     "car": "???",
     "gear": 0,
@@ -65,6 +165,25 @@ PLOT_RPM = "plot_rpm"
 PLOT_BOOST = "plot_boost"
 PLOT_PEDALS = "plot_pedals"
 
+SERIES_G_LONG = "series_g_long"
+SERIES_SHIFTS = "series_shifts"
+SERIES_WHEELSPIN = "series_wheelspin"
+SERIES_LIMITER_HITS = "series_limiter_hits"
+PLOT_ACCEL = "plot_accel"
+PLOT_WHEELSPIN = "plot_wheelspin"
+SERIES_REF_SPEED = "series_ref_speed"
+SERIES_REF_RPM = "series_ref_rpm"
+DERIVED_ROW_TAG = "derived_row"
+EXPORT_TEXT_TAG = "export_text"
+
+STATS_TEXT_TAG = "stats_text"
+
+REF_TEXT_TAG = "ref_text"
+REF_DIALOG_TAG = "ref_dialog"
+
+PROFILER_WINDOW_TAG = "profiler_window"
+PROFILER_INFO_TAG = "profiler_info"
+
 # viewport/layout cache
 _last_vp_w = None
 _last_vp_h = None
@@ -75,6 +194,177 @@ def on_autoscroll(sender, app_data=None, user_data=None):
     scroll_active = bool(dpg.get_value("en_autoscroll"))
 
 
+def on_jitter(sender, app_data=None, user_data=None):
+    global jitter_active, jitter
+    if bool(dpg.get_value("en_jitter")):
+        # fresh buffer (and counters) each time it's switched on
+        jitter = JitterBank(latency_ms=JITTER_LATENCY_MS)
+        jitter_active = True
+    else:
+        jitter_active = False
+
+
+def on_derived(sender, app_data=None, user_data=None):
+    global derived_active, _last_vp_w
+    derived_active = bool(dpg.get_value("en_derived"))
+    dpg.configure_item(DERIVED_ROW_TAG, show=derived_active)
+    _last_vp_w = None  # re-split plot heights for 2 or 3 rows
+
+
+def on_export(sender, app_data=None, user_data=None):
+    # done by update_ui_tick(), between drains, so history holds still
+    global _export_request
+    _export_request = True
+
+
+def _export_tick():
+    global _export_request
+    if not _export_request:
+        return
+    _export_request = False
+    path = time.strftime("erinsmod_session_%Y%m%d_%H%M%S.csv")
+    _write_csv_async(path, 0, EXPORT_TEXT_TAG, "EXPORT", "Exported {n} samples to {path}", "Export failed")
+
+
+def _write_csv_async(path, start, tag, label, done_msg, fail_msg):
+    """Copies history from `start` here, on the UI loop, then computes the
+    derived channels and writes the CSV on a worker thread so the window
+    keeps rendering. The outcome is shown in `tag`."""
+    global _csv_job
+    if _csv_job is not None and _csv_job.is_alive():
+        dpg.set_value(tag, "Still writing the last CSV...")
+        return
+    cols = {k: v[start:] for k, v in history.items()}
+
+    def job():
+        try:
+            n = export_csv(path, cols)
+            msg = done_msg.format(n=n, path=path)
+        except Exception as e:
+            msg = f"{fail_msg}: {e}"
+        print(f"[{label}] {msg}")
+        dpg.set_value(tag, msg)
+
+    dpg.set_value(tag, f"Writing {path}...")
+    _csv_job = threading.Thread(target=job, daemon=True)
+    _csv_job.start()
+
+
+def _set_reference(ref, msg):
+    global reference
+    reference = ref
+    _start_run()
+    if ref is not None:
+        msg += f" ({ref.length_m:.0f} m, {ref.duration_s:.1f}s, {len(ref)} samples)"
+    print(f"[REF] {msg}")
+    dpg.set_value(REF_TEXT_TAG, msg)
+
+
+def _start_run():
+    """The live run starts at the newest sample; delta and overlay are
+    measured from here."""
+    global run_t0, run_d0, _ref_upto
+    if history["t"]:
+        run_t0, run_d0 = history["t"][-1], history["dist"][-1]
+    else:
+        run_t0, run_d0 = time.time() - start_time, 0.0
+    _ref_upto = 0
+    for k in ref_hist:
+        ref_hist[k].clear()
+    dpg.set_value(SERIES_REF_SPEED, [[], []])
+    dpg.set_value(SERIES_REF_RPM, [[], []])
+
+
+def on_ref_load(sender, app_data=None, user_data=None):
+    dpg.show_item(REF_DIALOG_TAG)
+
+
+def on_ref_file(sender, app_data=None, user_data=None):
+    # parsed here, off the UI loop; only the finished run is handed over
+    global _ref_pending
+    path = app_data.get("file_path_name") if app_data else None
+    if not path:
+        return
+    try:
+        _ref_pending = (ReferenceRun.from_csv(path), f"Reference: {os.path.basename(path)}")
+    except Exception as e:
+        dpg.set_value(REF_TEXT_TAG, f"Load failed: {e}")
+
+
+def on_ref_from_run(sender, app_data=None, user_data=None):
+    # like Export CSV, history is only read from update_ui_tick()
+    global _ref_from_run_request
+    _ref_from_run_request = True
+
+
+def on_run_save(sender, app_data=None, user_data=None):
+    global _save_run_request
+    _save_run_request = True
+
+
+def _run_start_index():
+    """First history index of the live run, or None if it has under two
+    samples."""
+    i0 = bisect_left(history["t"], run_t0) if run_t0 is not None else 0
+    return i0 if len(history["t"]) - i0 >= 2 else None
+
+
+def _run_tick():
+    """Applies the reference and run buttons. reference, run_t0 and
+    ref_hist are only changed here, on the UI loop that reads them."""
+    global _save_run_request, _ref_from_run_request, _run_start_request, _ref_pending
+    if _ref_pending is not None:
+        (ref, msg), _ref_pending = _ref_pending, None
+        _run_start_request = False      # _set_reference() starts a run anyway
+        _set_reference(ref, msg)
+    if _run_start_request:
+        _run_start_request = False
+        _start_run()
+    if _save_run_request:
+        _save_run_request = False
+        i0 = _run_start_index()
+        if i0 is None:
+            dpg.set_value(REF_TEXT_TAG, "Nothing recorded since Start Run")
+        else:
+            path = time.strftime("erinsmod_run_%Y%m%d_%H%M%S.csv")
+            _write_csv_async(path, i0, REF_TEXT_TAG, "REF", "Saved run ({n} samples) to {path}", "Save failed")
+    if _ref_from_run_request:
+        _ref_from_run_request = False
+        i0 = _run_start_index()
+        if i0 is None:
+            dpg.set_value(REF_TEXT_TAG, "Nothing recorded since Start Run")
+        else:
+            _set_reference(ReferenceRun({k: v[i0:] for k, v in history.items()}), "Reference: last run")
+
+
+def on_run_start(sender, app_data=None, user_data=None):
+    global _run_start_request
+    _run_start_request = True
+
+
+def on_ref_clear(sender, app_data=None, user_data=None):
+    global _ref_pending
+    _ref_pending = (None, "No reference")
+
+
+def on_profiler(sender, app_data=None, user_data=None):
+    # applied at the start of the next frame, so no lap spans the switch
+    global _prof_pending
+    _prof_pending = bool(dpg.get_value("en_profiler"))
+    dpg.configure_item(PROFILER_WINDOW_TAG, show=_prof_pending)
+
+
+def on_profiler_close(sender=None, app_data=None, user_data=None):
+    dpg.set_value("en_profiler", False)
+    on_profiler(sender)
+
+
+def on_profile_capture(sender, app_data=None, user_data=None):
+    # picked up by the main loop so the profiler runs on the render thread
+    global _cprof_request
+    _cprof_request = True
+
+
 def udp_json_listener():
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -107,40 +397,66 @@ def udp_json_listener():
             continue
 
         try:
-            txt = data.decode("utf-8", errors="replace")
-            obj = json.loads(txt)
-
-            # local time axis (does not depend on sender)
-            t_rel = time.time() - start_time
-
-            rpm = float(obj.get("rpm", 0.0))
-            speed_kmh = float(obj.get("kmh", 0.0))
-            speed_mph = float(obj.get("mph", 0.0))
-            boost_psi = float(obj.get("psi", obj.get("boost", 0.0)))
-
-            thr = float(obj.get("throttle", obj.get("thr", 0.0)))
-            brk = float(obj.get("brake", obj.get("brk", 0.0)))
-            clt = float(obj.get("clutch", obj.get("clt", 0.0)))
-
-            car = str(obj.get("car", "???"))
-            gear = int(obj.get("gear", 0))
+            sample, car, gear, obj = _parse_json_sample(data)
 
             meta["car"] = car
             meta["gear"] = gear
             meta["last_time"] = time.time()
             meta["pkt_ok"] += 1
 
-            sample_q.put_nowait((t_rel, rpm, speed_kmh, speed_mph, boost_psi, thr, brk, clt))
+            jb = jitter
+            if jitter_active and jb is not None and "time" in obj:
+                # re-timed by the sender's clock in _drain_jitter()
+                jb.push(obj)
+            else:
+                sample_q.put_nowait(sample)
+                if sinks is not None:
+                    sinks.submit(obj)
 
         except Exception:
             meta["json_fail"] += 1
-            pass
+            continue
+
+        # after the hand-off, so a stats error can't cost the frame
+        if session_stats is not None:
+            try:
+                session_stats.add_frame(obj)
+            except Exception as e:
+                print(f"[STATS] frame skipped: {e}")
+
+
+def _parse_json_sample(data):
+    txt = data.decode("utf-8", errors="replace")
+    obj = json.loads(txt)
+
+    # local time axis (does not depend on sender)
+    t_rel = time.time() - start_time
+
+    sample, car, gear = _sample_from_obj(obj, t_rel)
+    return sample, car, gear, obj
+
+
+def _sample_from_obj(obj, t_rel):
+    rpm = float(obj.get("rpm", 0.0))
+    speed_kmh = float(obj.get("kmh", 0.0))
+    speed_mph = float(obj.get("mph", 0.0))
+    boost_psi = float(obj.get("psi", obj.get("boost", 0.0)))
+
+    thr = float(obj.get("throttle", obj.get("thr", 0.0)))
+    brk = float(obj.get("brake", obj.get("brk", 0.0)))
+    clt = float(obj.get("clutch", obj.get("clt", 0.0)))
+
+    car = str(obj.get("car", "???"))
+    gear = int(obj.get("gear", 0))
+    limiter = float(obj.get("limiter", 0.0))
+
+    return (t_rel, rpm, speed_kmh, speed_mph, boost_psi, thr, brk, clt, gear, limiter), car, gear
 
 
 def _store_sample_decimated(sample):
-    global _last_store_t, scroll_ready, scroll_time
+    global _last_store_t, _dist_prev, _dist_last
 
-    t, rpm, speed_kmh, speed_mph, boost_psi, thr, brk, clt = sample
+    t, rpm, speed_kmh, speed_mph, boost_psi, thr, brk, clt, gear, limiter = sample
 
     if _last_store_t is None:
         _last_store_t = t
@@ -148,38 +464,210 @@ def _store_sample_decimated(sample):
     else:
         do_append = (t - _last_store_t) >= SAMPLE_DT
 
+    # trapezoid step from the point before this one (km/h -> m/s)
     if do_append:
-        _last_store_t = t
-        history["t"].append(t)
-        history["rpm"].append(rpm)
-        history["speed_kmh"].append(speed_kmh)
-        history["speed_mph"].append(speed_mph)
-        history["boost_psi"].append(boost_psi)
-        history["throttle"].append(thr)
-        history["brake"].append(brk)
-        history["clutch"].append(clt)
+        _dist_prev = _dist_last
+    if _dist_prev is None:
+        dist = 0.0
     else:
-        if history["t"]:
-            history["t"][-1] = t
-            history["rpm"][-1] = rpm
-            history["speed_kmh"][-1] = speed_kmh
-            history["speed_mph"][-1] = speed_mph
-            history["boost_psi"][-1] = boost_psi
-            history["throttle"][-1] = thr
-            history["brake"][-1] = brk
-            history["clutch"][-1] = clt
+        t0, v0, dist = _dist_prev
+        if t > t0:
+            dist += (v0 + speed_kmh) * (t - t0) / 7.2
+    _dist_last = (t, speed_kmh, dist)
+
+    h = history
+    if do_append:
+        _last_store_t = t
+        h["t"].append(t)
+        h["rpm"].append(rpm)
+        h["speed_kmh"].append(speed_kmh)
+        h["speed_mph"].append(speed_mph)
+        h["boost_psi"].append(boost_psi)
+        h["throttle"].append(thr)
+        h["brake"].append(brk)
+        h["clutch"].append(clt)
+        h["gear"].append(gear)
+        h["limiter"].append(limiter)
+        h["dist"].append(dist)
+    elif h["t"]:
+        h["t"][-1] = t
+        h["rpm"][-1] = rpm
+        h["speed_kmh"][-1] = speed_kmh
+        h["speed_mph"][-1] = speed_mph
+        h["boost_psi"][-1] = boost_psi
+        h["throttle"][-1] = thr
+        h["brake"][-1] = brk
+        h["clutch"][-1] = clt
+        h["gear"][-1] = gear
+        h["limiter"][-1] = limiter
+        h["dist"][-1] = dist
 
     if len(history["t"]) > MAX_POINTS:
+        cut = len(history["t"]) - MAX_POINTS
         for k in history:
-            history[k] = history[k][-MAX_POINTS:]
+            del history[k][:cut]    # in place: a memmove, no new list
+        _trim_derived(cut)
+        _trim_reference(cut)
+
 
-    elapsed = time.time() - start_time
+def _update_scroll(elapsed):
+    # once per tick rather than per stored sample; the window only
+    # follows while samples arrive
+    global scroll_ready, scroll_time
     if (not scroll_ready) and elapsed >= 30.0:
         scroll_ready = True
     if scroll_ready:
         scroll_time = elapsed
 
 
+def _trim_derived(cut):
+    global _derived_upto, _refs_upto
+    for k in derived_hist:
+        del derived_hist[k][:cut]
+    _derived_upto = max(0, _derived_upto - cut)
+    _refs_upto = max(0, _refs_upto - cut)
+    if history["t"]:
+        t0 = history["t"][0]
+        for t_key, v_key in (("shift_t", "shift_g"), ("limiter_t", "limiter_rpm")):
+            ts, vs = derived_events[t_key], derived_events[v_key]
+            i = 0
+            while i < len(ts) and ts[i] < t0:
+                i += 1
+            del ts[:i], vs[:i]
+
+
+def _trim_reference(cut):
+    global _ref_upto
+    _ref_upto = max(0, _ref_upto - cut)
+    i = bisect_left(ref_hist["t"], history["t"][0])
+    for k in ref_hist:
+        del ref_hist[k][:i]
+
+
+def _update_reference():
+    """Extends ref_hist with the reference sampled at the distance of each
+    new history point (one binary search per point). The last point is
+    redone, since decimation can still overwrite it."""
+    global _ref_upto
+
+    t, dist = history["t"], history["dist"]
+    n = len(t)
+    start = max(_ref_upto - 1, bisect_left(t, run_t0), 0)
+    if start >= n:
+        return
+    i = bisect_left(ref_hist["t"], t[start])
+    for k in ref_hist:
+        del ref_hist[k][i:]
+
+    length = reference.length_m
+    for j in range(start, n):
+        d = dist[j] - run_d0
+        if d > length:
+            break
+        _, *vals = reference.sample(d, REF_PLOTTED)
+        ref_hist["t"].append(t[j])
+        for name, v in zip(REF_PLOTTED, vals):
+            ref_hist[name].append(v)
+    _ref_upto = n
+
+
+def _ref_delta():
+    """(delta s, run distance m) at the newest sample, or None. Positive
+    delta = behind the reference."""
+    if reference is None or not history["t"] or history["t"][-1] < run_t0:
+        return None
+    d = history["dist"][-1] - run_d0
+    if d > reference.length_m:
+        return None
+    return (history["t"][-1] - run_t0) - reference.time_at(d), d
+
+
+def _update_gear_refs(n, start):
+    """Counts settled history points into gear_refs. When a gear's
+    reference moves, its wheelspin before `start` is redone, so the plot
+    matches a bulk run over the session (Export CSV, outgauge_derived.py)."""
+    global _refs_upto
+
+    upto = n - DERIVED_REDO
+    if upto <= _refs_upto:
+        return
+    lo = _refs_upto
+    ratio = outgauge_derived.rpm_per_kmh(history["rpm"][lo:upto], history["speed_kmh"][lo:upto])
+    changed = gear_refs.add(ratio, history["gear"][lo:upto])
+    _refs_upto = upto
+
+    if changed and start > 0:
+        gear = np.asarray(history["gear"][:start], dtype=float)
+        idx = np.flatnonzero(np.isin(gear, list(changed)))
+        if len(idx):
+            rpm = np.asarray(history["rpm"][:start])[idx]
+            kmh = np.asarray(history["speed_kmh"][:start])[idx]
+            vals = outgauge_derived.wheelspin(outgauge_derived.rpm_per_kmh(rpm, kmh), gear[idx], gear_refs)
+            # rebuilt as one slice, no per-point Python loop
+            ws = derived_hist["wheelspin_pct"]
+            redo = np.asarray(ws[:start], dtype=float)
+            redo[idx] = vals
+            ws[:start] = redo.tolist()
+
+
+def _update_derived():
+    """Extends derived_hist to cover history. Only the new points plus
+    DERIVED_REDO are replaced; DERIVED_CONTEXT_S of older history is read
+    for smoothing. Per-gear wheelspin references cover the whole session
+    (gear_refs)."""
+    global _derived_upto
+
+    n = len(history["t"])
+    if n < 3:
+        return
+    start = max(0, min(_derived_upto, n) - DERIVED_REDO)
+    _update_gear_refs(n, start)
+    ctx = max(0, start - int(DERIVED_CONTEXT_S * SAMPLE_HZ))
+    chunk = {k: history[k][ctx:] for k in ("t", "rpm", "speed_kmh", "gear", "limiter")}
+    out = outgauge_derived.compute(chunk, gear_refs=gear_refs)
+    off = start - ctx
+
+    for name in DERIVED_PLOTTED:
+        del derived_hist[name][start:]
+        derived_hist[name].extend(out[name][off:].tolist())
+
+    # events in the redone range are rebuilt from this chunk
+    t_arr = np.asarray(chunk["t"])
+    t_start = history["t"][start]
+    for t_key, v_key, flag, values in (
+        ("shift_t", "shift_g", "shift", out["g_long"]),
+        ("limiter_t", "limiter_rpm", "limiter_hit", np.asarray(chunk["rpm"])),
+    ):
+        ts, vs = derived_events[t_key], derived_events[v_key]
+        while ts and ts[-1] >= t_start:
+            ts.pop()
+            vs.pop()
+        idx = np.flatnonzero(out[flag][off:]) + off
+        ts.extend(t_arr[idx].tolist())
+        vs.extend(np.nan_to_num(values[idx]).tolist())
+
+    _derived_upto = n
+
+
+def export_csv(path, cols=None):
+    """Writes `cols` (a copy of history by default) and derived channels,
+    if numpy is available, to CSV. The export buttons call it from a
+    worker thread, with columns copied on the UI loop."""
+    if cols is None:
+        cols = {k: list(v) for k, v in history.items()}
+    if outgauge_derived is not None and cols["t"]:
+        for name, arr in outgauge_derived.compute(cols).items():
+            cols[name] = arr
+        outgauge_derived.save_csv(path, cols)
+    else:
+        import csv
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(cols.keys())
+            w.writerows(zip(*cols.values()))
+    return len(cols["t"])
+
+
 def _drain_queue(max_items=10000):
     n = 0
     while n < max_items:
@@ -192,6 +680,22 @@ def _drain_queue(max_items=10000):
     return n
 
 
+def _drain_jitter():
+    jb = jitter
+    if not jitter_active or jb is None:
+        return 0
+    ready = jb.pop_ready()
+    for play_at, obj in ready:
+        try:
+            sample, _, _ = _sample_from_obj(obj, play_at - start_time)
+        except Exception:
+            continue
+        _store_sample_decimated(sample)
+        if sinks is not None:
+            sinks.submit(obj)
+    return len(ready)
+
+
 def _apply_time_axis_limits(elapsed_time: float):
     if scroll_active:
         if scroll_ready:
@@ -203,11 +707,131 @@ def _apply_time_axis_limits(elapsed_time: float):
         dpg.set_axis_limits("rpm_time", lo, hi)
         dpg.set_axis_limits("boost_time", lo, hi)
         dpg.set_axis_limits("pedal_time", lo, hi)
+        dpg.set_axis_limits("accel_time", lo, hi)
+        dpg.set_axis_limits("wheelspin_time", lo, hi)
     else:
         dpg.set_axis_limits_auto("speed_time")
         dpg.set_axis_limits_auto("rpm_time")
         dpg.set_axis_limits_auto("boost_time")
         dpg.set_axis_limits_auto("pedal_time")
+        dpg.set_axis_limits_auto("accel_time")
+        dpg.set_axis_limits_auto("wheelspin_time")
+
+
+def _prof_begin():
+    global _prof_t0, _prof_frame_t0, profile_active, _prof_pending
+    if _prof_pending is not None:
+        if _prof_pending and not profile_active:
+            for samples in _prof_samples.values():
+                samples.clear()
+        profile_active, _prof_pending = _prof_pending, None
+    if profile_active:
+        _prof_t0 = _prof_frame_t0 = time.perf_counter()
+
+
+def _prof_lap(phase):
+    # time since the previous lap is charged to `phase`
+    global _prof_t0
+    if not profile_active:
+        return
+    now = time.perf_counter()
+    _prof_samples[phase].append(now - _prof_t0)
+    _prof_t0 = now
+
+
+def _prof_skip():
+    # time since the previous lap isn't charged to any phase
+    global _prof_t0
+    if profile_active:
+        _prof_t0 = time.perf_counter()
+
+
+def _prof_end():
+    if profile_active:
+        _prof_samples["frame"].append(time.perf_counter() - _prof_frame_t0)
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    idx = int(round((pct / 100.0) * (len(sorted_vals) - 1)))
+    return sorted_vals[idx]
+
+
+def _cprofile_tick():
+    global _cprof, _cprof_until, _cprof_request, _cprof_last_file
+
+    if _cprof_request and _cprof is None:
+        _cprof_request = False
+        _cprof = cProfile.Profile()
+        _cprof_until = time.time() + PROFILE_CAPTURE_S
+        _cprof.enable()
+        print(f"[PROF] cProfile capture started ({PROFILE_CAPTURE_S:.0f}s)")
+    elif _cprof is not None and time.time() >= _cprof_until:
+        _cprof.disable()
+        path = time.strftime("erinsmod_profile_%Y%m%d_%H%M%S.prof")
+        try:
+            _cprof.dump_stats(path)
+            _cprof_last_file = path
+            print(f"[PROF] cProfile capture written to {path}")
+        except Exception as e:
+            _cprof_last_file = f"write failed: {e}"
+            print(f"[PROF] cProfile dump failed: {e}")
+        _cprof = None
+
+
+def _update_profiler_overlay():
+    global _last_prof_push
+
+    now = time.time()
+    if (now - _last_prof_push) < PROFILE_UI_DT:
+        return
+    _last_prof_push = now
+
+    for phase in PROFILE_PHASES:
+        vals = sorted(_prof_samples[phase])
+        dpg.set_value(f"prof_{phase}_p50", f"{_percentile(vals, 50) * 1000.0:.2f}")
+        dpg.set_value(f"prof_{phase}_p95", f"{_percentile(vals, 95) * 1000.0:.2f}")
+        dpg.set_value(f"prof_{phase}_p99", f"{_percentile(vals, 99) * 1000.0:.2f}")
+
+    if _cprof is not None:
+        info = f"cProfile capturing... {max(0.0, _cprof_until - now):.1f}s left"
+    elif _cprof_last_file:
+        info = f"Last capture: {_cprof_last_file}"
+    else:
+        info = f"Frames in window: {len(_prof_samples['frame'])}"
+    dpg.set_value(PROFILER_INFO_TAG, info)
+
+
+def on_stats_reset(sender, app_data=None, user_data=None):
+    if session_stats is not None:
+        session_stats.reset()
+
+
+def _fmt_stat(v, fmt):
+    return "-" if v is None else format(v, fmt)
+
+
+def _update_stats_text():
+    global _last_stats_push
+
+    if session_stats is None:
+        return
+    now = time.time()
+    if (now - _last_stats_push) < STATS_UI_DT:
+        return
+    _last_stats_push = now
+
+    s = session_stats.snapshot()
+    rpm_w = s["channels"]["rpm"]["window"]
+    txt = (
+        f"Peak boost {_fmt_stat(s['peak_boost_psi'], '.1f')} psi | "
+        f"Vmax {_fmt_stat(s['max_speed_kmh'], '.1f')} km/h | "
+        f"Limiter {s['limiter_s']:.1f}s ({s['limiter_hits']}x) | "
+        f"Overlap {s['pedal_overlap_s']:.1f}s | "
+        f"RPM {rpm_w['seconds']:.0f}s avg {_fmt_stat(rpm_w['mean'], '.0f')} p95 {_fmt_stat(rpm_w['p95'], '.0f')}"
+    )
+    dpg.set_value(STATS_TEXT_TAG, txt)
 
 
 def _prime_layout():
@@ -236,14 +860,15 @@ def _prime_layout():
     except Exception:
         pass
     
-    TOP_UI_EST = 120  # rough but stable
+    TOP_UI_EST = 145  # rough but stable
 
 
     avail = vp_h - TOP_UI_EST
     if avail < 200:
         plot_h = 120
     else:
-        plot_h = int((avail - 12) / 1.9)
+        rows = 3 if derived_active else 2
+        plot_h = int((avail - 12) / (rows - 0.1))
         if plot_h < 120:
             plot_h = 120
 
@@ -252,7 +877,7 @@ def _prime_layout():
     except Exception:
         pass
 
-    for plot_tag in (PLOT_SPEED, PLOT_RPM, PLOT_BOOST, PLOT_PEDALS):
+    for plot_tag in (PLOT_SPEED, PLOT_RPM, PLOT_BOOST, PLOT_PEDALS, PLOT_ACCEL, PLOT_WHEELSPIN):
         try:
             dpg.configure_item(plot_tag, height=plot_h)
         except Exception:
@@ -262,15 +887,29 @@ def update_ui_tick():
     global _last_plot_push
 
     _prime_layout()
+    _prof_lap("layout")
 
     drained = _drain_queue()
+    drained += _drain_jitter()
+    _prof_lap("drain")
 
     now = time.time()
     elapsed = now - start_time
+    if drained:
+        _update_scroll(elapsed)
     _apply_time_axis_limits(elapsed)
+    _prof_lap("axis_limits")
 
     # push plots at UI_DT
-    if (now - _last_plot_push) >= UI_DT:
+    push = (now - _last_plot_push) >= UI_DT
+    if push and derived_active and outgauge_derived is not None:
+        _update_derived()
+    _prof_lap("derived")
+    if push and reference is not None:
+        _update_reference()
+    _prof_lap("reference")
+
+    if push:
         _last_plot_push = now
 
         if history["t"]:
@@ -283,6 +922,18 @@ def update_ui_tick():
             dpg.set_value(SERIES_BRK, [t, history["brake"]])
             dpg.set_value(SERIES_CLT, [t, history["clutch"]])
 
+            if derived_active and outgauge_derived is not None:
+                td = t[:len(derived_hist["g_long"])]
+                dpg.set_value(SERIES_G_LONG, [td, derived_hist["g_long"]])
+                dpg.set_value(SERIES_WHEELSPIN, [td, derived_hist["wheelspin_pct"]])
+                dpg.set_value(SERIES_SHIFTS, [derived_events["shift_t"], derived_events["shift_g"]])
+                dpg.set_value(SERIES_LIMITER_HITS, [derived_events["limiter_t"], derived_events["limiter_rpm"]])
+
+            if reference is not None:
+                dpg.set_value(SERIES_REF_SPEED, [ref_hist["t"], ref_hist["speed_kmh"]])
+                dpg.set_value(SERIES_REF_RPM, [ref_hist["t"], ref_hist["rpm"]])
+    _prof_lap("set_value")
+
     # status
     age = time.time() - meta["last_time"] if meta["last_time"] else 9999.0
 
@@ -298,14 +949,35 @@ def update_ui_tick():
             f"Car {meta['car']} | Gear {gear_txt} | "
             f"{history['rpm'][-1]:.0f} rpm | {history['speed_kmh'][-1]:.1f} km/h | "
             f"Boost {history['boost_psi'][-1]:.1f} psi | "
-            f"{'LIVE' if age < 1.0 else f'{age:.1f}s since last packet'}\n"
+            f"{'LIVE' if age < 1.0 else f'{age:.1f}s since last packet'}"
         )
+        if jitter_active and jitter is not None:
+            js = jitter.snapshot()
+            status += (
+                f" | Jitter +{js['latency_ms']:.0f}ms: reordered {js['reordered']} "
+                f"dropped {js['dropped']} interp {js['interpolated']} dup {js['duplicates']}"
+            )
+        delta = _ref_delta()
+        if delta is not None:
+            status += f" | Ref {delta[0]:+.2f}s @ {delta[1]:.0f} m"
+        if sinks is not None:
+            status += " | Sinks: " + sinks.summary()
+        status += "\n"
     else:
         status = (
             f"Waiting for data on {BIND_ADDR_UDP}:{JSON_PORT}...\n"
         )
 
     dpg.set_value(STATUS_TEXT_TAG, status)
+    _update_stats_text()
+    _prof_lap("status")
+
+    # one-off work and the overlay only show up in "frame", not in a phase
+    _export_tick()
+    _run_tick()
+    if profile_active:
+        _update_profiler_overlay()
+    _prof_skip()
 
 
 def build_ui():
@@ -321,8 +993,27 @@ def build_ui():
         no_scroll_with_mouse=True,
         no_collapse=True,
     ):
-        dpg.add_checkbox(label="Auto-Scroll", tag="en_autoscroll", callback=on_autoscroll)
-        dpg.set_value("en_autoscroll", scroll_active)
+        with dpg.group(horizontal=True):
+            dpg.add_checkbox(label="Auto-Scroll", tag="en_autoscroll", callback=on_autoscroll)
+            dpg.set_value("en_autoscroll", scroll_active)
+            if JitterBank is not None:
+                dpg.add_checkbox(label="Jitter Buffer", tag="en_jitter", callback=on_jitter)
+            if outgauge_derived is not None:
+                dpg.add_checkbox(label="Derived Channels", tag="en_derived", callback=on_derived)
+            dpg.add_checkbox(label="Frame Profiler", tag="en_profiler", callback=on_profiler)
+            dpg.add_button(label="Export CSV", callback=on_export)
+            dpg.add_text("", tag=EXPORT_TEXT_TAG, color=(200, 200, 200, 255))
+            if session_stats is not None:
+                dpg.add_button(label="Reset Stats", callback=on_stats_reset)
+                dpg.add_text("", tag=STATS_TEXT_TAG, color=(200, 200, 200, 255))
+        if ReferenceRun is not None:
+            with dpg.group(horizontal=True):
+                dpg.add_button(label="Start Run", callback=on_run_start)
+                dpg.add_button(label="Save Run", callback=on_run_save)
+                dpg.add_button(label="Use Run As Reference", callback=on_ref_from_run)
+                dpg.add_button(label="Load Reference...", callback=on_ref_load)
+                dpg.add_button(label="Clear Reference", callback=on_ref_clear)
+                dpg.add_text("No reference", tag=REF_TEXT_TAG, color=(200, 200, 200, 255))
         dpg.add_separator()
 
         dpg.add_text(default_value="Status:", color=(200, 200, 200, 255))
@@ -355,6 +1046,7 @@ def build_ui():
                         yaxis = dpg.add_plot_axis(dpg.mvYAxis, label="Speed", auto_fit=True)
                         dpg.add_line_series([], [], label="km/h", parent=yaxis, tag=SERIES_SPEED_KMH)
                         dpg.add_line_series([], [], label="mph", parent=yaxis, tag=SERIES_SPEED_MPH)
+                        dpg.add_line_series([], [], label="ref km/h", parent=yaxis, tag=SERIES_REF_SPEED)
 
                 with dpg.table_cell():
                     with dpg.plot(tag=PLOT_RPM, label="RPM", height=plot_height, width=-1):
@@ -362,6 +1054,8 @@ def build_ui():
                         dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="rpm_time")
                         yaxis = dpg.add_plot_axis(dpg.mvYAxis, label="RPM", auto_fit=True)
                         dpg.add_line_series([], [], label="rpm", parent=yaxis, tag=SERIES_RPM)
+                        dpg.add_line_series([], [], label="ref rpm", parent=yaxis, tag=SERIES_REF_RPM)
+                        dpg.add_scatter_series([], [], label="limiter hit", parent=yaxis, tag=SERIES_LIMITER_HITS)
 
             with dpg.table_row():
                 with dpg.table_cell():
@@ -380,6 +1074,53 @@ def build_ui():
                         dpg.add_line_series([], [], label="brake", parent=yaxis, tag=SERIES_BRK)
                         dpg.add_line_series([], [], label="clutch", parent=yaxis, tag=SERIES_CLT)
 
+            # derived channels, shown with the "Derived Channels" checkbox
+            with dpg.table_row(tag=DERIVED_ROW_TAG, show=False):
+                with dpg.table_cell():
+                    with dpg.plot(tag=PLOT_ACCEL, label="Longitudinal accel (g)", height=plot_height, width=-1):
+                        dpg.add_plot_legend()
+                        dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="accel_time")
+                        yaxis = dpg.add_plot_axis(dpg.mvYAxis, label="g", auto_fit=True)
+                        dpg.add_line_series([], [], label="long g", parent=yaxis, tag=SERIES_G_LONG)
+                        dpg.add_scatter_series([], [], label="shift", parent=yaxis, tag=SERIES_SHIFTS)
+
+                with dpg.table_cell():
+                    with dpg.plot(tag=PLOT_WHEELSPIN, label="Wheelspin (% over gear ratio)", height=plot_height, width=-1):
+                        dpg.add_plot_legend()
+                        dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="wheelspin_time")
+                        yaxis = dpg.add_plot_axis(dpg.mvYAxis, label="%", auto_fit=True)
+                        dpg.add_line_series([], [], label="wheelspin", parent=yaxis, tag=SERIES_WHEELSPIN)
+
+    if ReferenceRun is not None:
+        with dpg.file_dialog(tag=REF_DIALOG_TAG, label="Load reference run (CSV)", show=False,
+                             callback=on_ref_file, width=600, height=400):
+            dpg.add_file_extension(".csv")
+
+    # floating overlay, shown while "Frame Profiler" is ticked
+    with dpg.window(
+        tag=PROFILER_WINDOW_TAG,
+        label="Frame Profiler (ms, last %d frames)" % PROFILE_WINDOW,
+        width=380,
+        height=260,
+        pos=[780, 40],
+        show=False,
+        no_collapse=True,
+        on_close=on_profiler_close,
+    ):
+        with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp, resizable=False):
+            dpg.add_table_column(label="Phase")
+            dpg.add_table_column(label="p50")
+            dpg.add_table_column(label="p95")
+            dpg.add_table_column(label="p99")
+            for phase in PROFILE_PHASES:
+                with dpg.table_row():
+                    dpg.add_text(phase)
+                    dpg.add_text("-", tag=f"prof_{phase}_p50")
+                    dpg.add_text("-", tag=f"prof_{phase}_p95")
+                    dpg.add_text("-", tag=f"prof_{phase}_p99")
+        dpg.add_button(label=f"Capture cProfile ({PROFILE_CAPTURE_S:.0f}s)", callback=on_profile_capture)
+        dpg.add_text("", tag=PROFILER_INFO_TAG)
+
     dpg.create_viewport(title="ErinsMod Telemetry", width=1200, height=700, resizable=True)
     dpg.setup_dearpygui()
     dpg.show_viewport()
@@ -391,6 +1132,9 @@ def main():
     t = threading.Thread(target=udp_json_listener, daemon=True)
     t.start()
 
+    if sinks is not None:
+        sinks.start()
+
     dpg.create_context()
     build_ui()
 
@@ -399,14 +1143,20 @@ def main():
 
     try:
         while dpg.is_dearpygui_running():
+            _cprofile_tick()
+            _prof_begin()
             try:
                 update_ui_tick()
             except Exception:
                 print("update_ui_tick exception:")
                 traceback.print_exc()
             dpg.render_dearpygui_frame()
+            _prof_lap("render")
+            _prof_end()
     finally:
         dpg.destroy_context()
+        if sinks is not None:
+            sinks.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+ErinsMod OutGauge Microbenchmarks
+----------------------------------------------------
+Times the hot paths of outgauge_dashboard.py and the Telemetry app,
+writes the results as JSON and compares them with bench_baseline.json.
+Exits with code 1 if any benchmark is slower than the baseline by more
+than --threshold percent, or if a baseline benchmark didn't run.
+Run:
+    python outgauge_bench.py
+    python outgauge_bench.py --skip-telemetry      # no dearpygui here
+    python outgauge_bench.py --threshold 15 --out results.json
+    python outgauge_bench.py --update-baseline
+----------------------------------------------------
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import struct
+import sys
+import time
+
+import outgauge_dashboard as dash
+from outgauge_reference import ReferenceRun
+from outgauge_rules import RuleEngine
+from outgauge_sinks import SinkSet
+from outgauge_simulator import SimCar, encode_bin, encode_json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TELEMETRY_PY = os.path.join(HERE, "ErinsMod Telemetry", "source", "ErinsMod Telemetry.py")
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+RESULTS_PATH = os.path.join(HERE, "bench_results.json")
+
+DEFAULT_THRESHOLD = 25.0    # percent slower than baseline before failing
+TELEMETRY_PREFIX = "tele."
+REPEATS = 7
+
+HISTORY_SIZES = (10_000, 200_000)
+FANOUT_CLIENTS = (1, 10, 100)
+REFERENCE_SIZES = (10_000, 500_000)
+RULE_COUNTS = (4, 300)
+SINK_TYPES = ("csv", "ndjson", "osc", "tcp")
+
+
+def load_telemetry():
+    """The Telemetry app lives in a file with a space in its name and needs
+    dearpygui installed; returns None if it can't be imported."""
+    try:
+        spec = importlib.util.spec_from_file_location("erinsmod_telemetry", TELEMETRY_PY)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        return mod
+    except Exception as e:
+        print(f"[bench] Telemetry app not loaded ({e}); skipping its benchmarks")
+        return None
+
+
+def sample_state():
+    car = SimCar(0, seed=1)
+    for i in range(300):
+        car.step(i / 60.0, 1.0 / 60.0)
+    return car.state(5000)
+
+
+class NullWriter:
+    """Stands in for an SSE client's wfile."""
+
+    def write(self, b):
+        return len(b)
+
+    def flush(self):
+        pass
+
+
+def measure(fn, ops, repeats=REPEATS, setup=None):
+    """Runs fn() `repeats` times (setup() before each, untimed); fn performs
+    `ops` operations. Returns ns/op for the best and median run."""
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    per_op = [t / ops * 1e9 for t in times]
+    return {"ns_per_op": round(min(per_op), 1), "median_ns_per_op": round(statistics.median(per_op), 1), "ops": ops}
+
+
+def _calibration_op(buf=bytes(range(96)), vals=[]):
+    vals.append(sum(struct.unpack("<24f", buf)))
+    d = {"a": 1.0, "b": 2.0, "c": 3.0}
+    d["d"] = float(d.get("a", 0.0)) + float(d.get("x", 1.0))
+    if len(vals) > 64:
+        del vals[:]
+
+
+def calibrate(scale):
+    """ns/op of a fixed pure-Python workload. Results are compared as a
+    ratio to this, which takes out most of the machine-speed (and
+    machine-load) difference between runs."""
+    n = 20000 * scale
+    op = _calibration_op
+    return measure(lambda: [op() for _ in range(n)], n)["ns_per_op"]
+
+
+class Bench:
+    """One benchmark: fn() performs `ops` operations; setup() runs untimed
+    before each repeat and teardown() once after the last."""
+
+    def __init__(self, name, fn, ops, setup=None, teardown=None, repeats=REPEATS):
+        self.name = name
+        self.fn = fn
+        self.ops = ops
+        self.setup = setup
+        self.teardown = teardown
+        self.repeats = repeats
+
+    def run(self):
+        try:
+            return measure(self.fn, self.ops, self.repeats, self.setup)
+        finally:
+            if self.teardown is not None:
+                self.teardown()
+
+
+# ------------- Dashboard -------------
+def dashboard_benches(scale):
+    state = sample_state()
+    bin_pkt = encode_bin(state)
+    json_pkt = encode_json(state)
+    n = 20000 * scale
+
+    parse = dash.parse_outgauge_packet
+    decode = dash.decode_json_packet
+    build = dash.build_sse_frame
+    frame = build(state.copy())
+
+    benches = [
+        Bench("dash.parse_outgauge_packet", lambda: [parse(bin_pkt) for _ in range(n)], n),
+        Bench("dash.json_decode", lambda: [decode(json_pkt) for _ in range(n)], n),
+        Bench("dash.build_sse_frame", lambda: [build(state.copy()) for _ in range(n)], n),
+    ]
+
+    def fanout(n_clients):
+        k = max(50, n // n_clients)
+
+        def setup():
+            dash.clients.clear()
+            dash.clients.update(NullWriter() for _ in range(n_clients))
+
+        return Bench(f"dash.broadcast_frame[{n_clients}]",
+                     lambda: [dash.broadcast_frame(frame) for _ in range(k)], k,
+                     setup=setup, teardown=dash.clients.clear)
+
+    benches += [fanout(c) for c in FANOUT_CLIENTS]
+    return benches
+
+
+# ------------- Telemetry app -------------
+def _reset_history(tele, size):
+    for k in tele.history:
+        tele.history[k] = [0.0] * size
+    tele.history["t"] = [i * tele.SAMPLE_DT for i in range(size)]
+    tele._last_store_t = tele.history["t"][-1] if size else None
+
+
+def _samples(t0, n, dt):
+    return [(t0 + i * dt, 5000.0, 120.0, 74.5, 12.0, 0.8, 0.0, 0.0, 4, 0.0) for i in range(n)]
+
+
+def telemetry_benches(tele, scale):
+    json_pkt = encode_json(sample_state())
+    n = 20000 * scale
+
+    parse = tele._parse_json_sample
+    store = tele._store_sample_decimated
+    benches = [Bench("tele.parse_json_sample", lambda: [parse(json_pkt) for _ in range(n)], n)]
+
+    def store_bench(name, size, dt, ops, cap=None, repeats=REPEATS):
+        samples = _samples(size * tele.SAMPLE_DT + 1.0, ops, dt)
+        saved_max = tele.MAX_POINTS
+
+        def setup():
+            if cap is not None:
+                tele.MAX_POINTS = cap
+            _reset_history(tele, size)
+
+        def teardown():
+            tele.MAX_POINTS = saved_max
+            _reset_history(tele, 0)
+
+        return Bench(name, lambda: [store(s) for s in samples], ops,
+                     setup=setup, teardown=teardown, repeats=repeats)
+
+    for size in HISTORY_SIZES:
+        # every sample is past SAMPLE_DT, so each one appends
+        benches.append(store_bench(f"tele.store_sample_append[{size}]", size, tele.SAMPLE_DT * 1.01, n))
+        # samples inside SAMPLE_DT overwrite the last point
+        benches.append(store_bench(f"tele.store_sample_decimate[{size}]", size, tele.SAMPLE_DT / 50.0, n))
+
+    # history already at MAX_POINTS: every append trims
+    cap = HISTORY_SIZES[-1]
+    benches.append(store_bench(f"tele.store_sample_at_cap[{cap}]", cap, tele.SAMPLE_DT * 1.01,
+                               50 * scale, cap=cap, repeats=3))
+
+    drain_samples = _samples(1.0, n, tele.SAMPLE_DT * 1.01)
+
+    def fill():
+        _reset_history(tele, 0)
+        for s in drain_samples:
+            tele.sample_q.put_nowait(s)
+
+    benches.append(Bench("tele.drain_queue", lambda: tele._drain_queue(max_items=n), n,
+                         setup=fill, teardown=lambda: _reset_history(tele, 0)))
+    return benches
+
+
+# ------------- Reference runs -------------
+def reference_benches(scale):
+    n = 20000 * scale
+    benches = []
+    for size in REFERENCE_SIZES:
+        # varying speed so the distance column isn't evenly spaced
+        ref = ReferenceRun({
+            "t": [i / 60.0 for i in range(size)],
+            "speed_kmh": [80.0 + 60.0 * ((i % 600) / 600.0) for i in range(size)],
+            "rpm": [5000.0] * size,
+        })
+        step = ref.length_m / n
+        dists = [((i * 7919) % n) * step for i in range(n)]
+        benches.append(Bench(f"ref.time_at[{size}]",
+                             lambda ref=ref, dists=dists: [ref.time_at(d) for d in dists], n))
+        benches.append(Bench(f"ref.sample[{size}]",
+                             lambda ref=ref, dists=dists: [ref.sample(d, ("speed_kmh", "rpm")) for d in dists], n))
+    return benches
+
+
+# ------------- Alert rules -------------
+def _rule_set(count):
+    if count <= 4:
+        with open(dash.RULES_FILE) as f:
+            return json.load(f)["rules"][:count]
+    channels = ("rpm", "psi", "kmh", "throttle", "brake")
+    spans = {"rpm": 9000.0, "psi": 40.0, "kmh": 250.0, "throttle": 1.0, "brake": 1.0}
+    return [
+        {"name": f"r{i}", "channel": channels[i % 5], "op": "<>"[i % 2],
+         "value": spans[channels[i % 5]] * ((i * 37) % 100) / 100.0,
+         "hysteresis": spans[channels[i % 5]] * 0.02, "min_duration_ms": 100 * (i % 3)}
+        for i in range(count)
+    ]
+
+
+def rules_benches(scale):
+    car = SimCar(0, seed=1)
+    frames = []
+    for i in range(2000):
+        car.step(i / 60.0, 1.0 / 60.0)
+        frames.append(car.state(i * 16))
+    n = 20000 * scale
+    stream = [frames[i % len(frames)] for i in range(n)]
+
+    def bench(count):
+        rule_set = _rule_set(count)
+        engine = RuleEngine(rule_set)
+        # compile() also resets the per-car state between repeats
+        return Bench(f"rules.evaluate[{count}]", lambda: [engine.evaluate(f) for f in stream], n,
+                     setup=lambda: engine.compile(rule_set))
+
+    return [bench(c) for c in RULE_COUNTS]
+
+
+# ------------- Output sinks -------------
+def sinks_benches(scale):
+    # the listener-side cost only: writers aren't started and the queues
+    # are big enough that nothing is dropped
+    n = 20000 * scale
+    state = sample_state()
+    frames = [dict(state, time=i) for i in range(n)]
+    holder = {}
+
+    def setup():
+        holder["sinks"] = SinkSet.from_specs([{"type": k, "max_queue": n + 1} for k in SINK_TYPES])
+
+    def run():
+        submit = holder["sinks"].submit
+        for f in frames:
+            submit(f)
+
+    return [Bench(f"sinks.submit[{len(SINK_TYPES)}]", run, n, setup=setup, teardown=holder.clear)]
+
+
+# ------------- Baseline comparison -------------
+def _calibrated(r, calib):
+    """Adds the relative cost, and the calibration it was taken against,
+    to result `r`. Each entry carries its own calibration, so a re-measured
+    entry (or one from another run) still reads consistently."""
+    r["calibration_ns_per_op"] = round(calib, 1)
+    r["relative"] = round(r["ns_per_op"] / calib, 3)
+    return r
+
+
+def compare(results, baseline, threshold, skipped=()):
+    """Compares the calibrated cost (ns/op over calibration ns/op). The
+    baseline column is the baseline's relative cost at this result's
+    calibration, so it reads directly against ns/op. Baseline entries with
+    no result fail as "missing", unless their name starts with one of the
+    `skipped` prefixes."""
+    rows = []
+    failed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, r["ns_per_op"], None, None, "new"))
+            continue
+        change = 100.0 * (r["relative"] - base["relative"]) / base["relative"]
+        status = "ok"
+        if change > threshold:
+            status = "REGRESSED"
+            failed.append(name)
+        rows.append((name, r["ns_per_op"], base["relative"] * r["calibration_ns_per_op"], change, status))
+    for name, base in baseline.items():
+        if name not in results:
+            if name.startswith(tuple(skipped)):
+                rows.append((name, None, base["ns_per_op"], None, "skipped"))
+            else:
+                rows.append((name, None, base["ns_per_op"], None, "MISSING"))
+                failed.append(name)
+    return rows, failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the OutGauge hot paths.")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="fail if a benchmark is this many percent slower than baseline")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--out", default=RESULTS_PATH, help="where to write results JSON")
+    ap.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    ap.add_argument("--retries", type=int, default=2,
+                    help="re-measure regressed benchmarks this many times before failing")
+    ap.add_argument("--quick", action="store_true", help="fewer ops per run (noisier)")
+    ap.add_argument("--skip-telemetry", action="store_true",
+                    help="don't run the Telemetry app benchmarks (and don't fail on their absence)")
+    args = ap.parse_args()
+
+    scale = 1 if args.quick else 5
+    benches = dashboard_benches(scale) + reference_benches(scale) + rules_benches(scale) + sinks_benches(scale)
+    tele = None if args.skip_telemetry else load_telemetry()
+    if tele is not None:
+        benches += telemetry_benches(tele, scale)
+    skipped = (TELEMETRY_PREFIX,) if args.skip_telemetry else ()
+
+    calib_before = calibrate(scale)
+    results = {b.name: b.run() for b in benches}
+    calib = (calib_before + calibrate(scale)) / 2.0
+    for r in results.values():
+        _calibrated(r, calib)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    # a noisy machine can make a single run look slow; re-measure anything
+    # over the threshold and keep its best result
+    for _ in range(args.retries):
+        _, failed = compare(results, baseline, args.threshold, skipped)
+        failed = [name for name in failed if name in results]
+        if not failed:
+            break
+        calib_retry = calibrate(scale)
+        for b in benches:
+            if b.name in failed:
+                r = _calibrated(b.run(), calib_retry)
+                if r["relative"] < results[b.name]["relative"]:
+                    results[b.name] = r
+
+    doc = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "calibration_ns_per_op": round(calib, 1),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(doc, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    rows, failed = compare(results, baseline, args.threshold, skipped)
+    print(f"{'benchmark':<40}{'ns/op':>12}{'baseline':>12}{'change':>9}  status")
+    for name, ns, base, change, status in rows:
+        ns_s = f"{ns:.1f}" if ns is not None else "-"
+        base_s = f"{base:.1f}" if base is not None else "-"
+        change_s = f"{change:+.1f}%" if change is not None else "-"
+        print(f"{name:<40}{ns_s:>12}{base_s:>12}{change_s:>9}  {status}")
+    print("(change compares ns/op relative to a calibration workload timed in the same run;")
+    print(" baseline is scaled to that calibration)")
+    print(f"Results written to {args.out}")
+
+    missing = [name for name in failed if name not in results]
+    regressed = [name for name in failed if name in results]
+    if missing:
+        print(f"{len(missing)} baseline benchmark(s) didn't run: {', '.join(missing)}")
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed more than {args.threshold:g}%: {', '.join(regressed)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
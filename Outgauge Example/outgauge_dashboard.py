@@ -11,6 +11,7 @@ Stop:
 ----------------------------------------------------
 """
 
+import os
 import socket
 import struct
 import json
@@ -20,6 +21,25 @@ import sys
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from socketserver import ThreadingMixIn
 
+# Sibling modules (outgauge_*.py) are optional: without one, its feature is
+# off and this file still runs on its own.
+try:
+    from outgauge_jitter import JitterBank
+except ImportError:
+    JitterBank = None
+try:
+    from outgauge_rules import RuleEngine
+except ImportError:
+    RuleEngine = None
+try:
+    from outgauge_sinks import SinkSet
+except ImportError:
+    SinkSet = None
+try:
+    from outgauge_stats import SessionStats
+except ImportError:
+    SessionStats = None
+
 BIND_ADDR_HTTP = "0.0.0.0"
 HTTP_PORT = 8080
 
@@ -29,6 +49,25 @@ BIND_ADDR_UDP = "127.0.0.1"
 
 BROADCAST_HZ = 20  # SSE push rate
 
+# Optional jitter buffer: order packets by OutGauge `time`, drop duplicates,
+# fill short gaps, and release them on the sender's schedule + a fixed delay.
+JITTER_BUFFER = False
+JITTER_LATENCY_MS = 100.0
+JITTER_RELEASE_HZ = 200
+
+# Alert rules, checked on every packet. State changes go out on /stream as
+# "alert" events; /alerts has what's on now.
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outgauge_rules.json")
+
+# Output sinks: every published frame also goes to each of these, written in
+# batches on the sink's own thread (see outgauge_sinks.py). Counters at /sinks.
+SINKS = [
+    # {"type": "csv", "path": "erinsmod_%Y%m%d_%H%M%S.csv"},
+    # {"type": "ndjson", "path": "erinsmod_%Y%m%d_%H%M%S.ndjson"},
+    # {"type": "osc", "host": "127.0.0.1", "port": 9000},
+    # {"type": "tcp", "host": "127.0.0.1", "port": 9100},
+]
+
 # ------------- Shared telemetry -------------
 latest_lock = threading.Lock()
 latest = None  # dict with keys: time, car, rpm, speed, turbo, etc.
@@ -36,6 +75,19 @@ latest = None  # dict with keys: time, car, rpm, speed, turbo, etc.
 clients_lock = threading.Lock()
 clients = set()  # set of file-like objects (wfile) for SSE
 
+jitter = JitterBank(latency_ms=JITTER_LATENCY_MS) if JITTER_BUFFER and JitterBank is not None else None
+stats = SessionStats() if SessionStats is not None else None  # served at /stats
+
+rules = None
+if RuleEngine is not None:
+    rules = RuleEngine.from_file(RULES_FILE) if os.path.exists(RULES_FILE) else RuleEngine()
+# events waiting for sse_broadcaster(), latest per (rule, car): bounded by the
+# rule count, and a rule's final state is never dropped
+alert_lock = threading.Lock()
+alert_pending = {}
+
+sinks = SinkSet.from_specs(SINKS) if SinkSet is not None else None
+
 
 def now_str():
     return time.strftime("%H:%M:%S", time.localtime())
@@ -70,14 +122,15 @@ def parse_outgauge_packet(b: bytes):
     parts = struct.unpack(_BASE_FMT, b[:_BASE_LEN])
     (
         time_ms, car_raw, flags, gear, plid,
-        speed, kmh, mph, rpm, turbo, bar, psi, limiter, thr, brk, clt
+        speed, kmh, mph, rpm, turbo, bar, psi, limiter, _show_lights,
+        thr, brk, clt, _display1, _display2
     ) = parts
     id_val = None
     if len(b) == _BASE_LEN + 4:
         (id_val,) = struct.unpack("<i", b[_BASE_LEN:_BASE_LEN+4])
 
     car = car_raw[:3].decode("ascii", errors="ignore").rstrip("\x00") or "ERX"
-    return {
+    obj = {
         "time": int(time_ms),
         "car": car,
         "flags": int(flags),
@@ -94,8 +147,67 @@ def parse_outgauge_packet(b: bytes):
         "throttle": float(thr),
         "brake": float(brk),
         "clutch": float(clt),
-        "id": id_val if id_val is not None else 0,
     }
+    # only 96-byte packets carry an id; without one, cars are told apart
+    # by plid (outgauge_frame.car_key)
+    if id_val is not None:
+        obj["id"] = int(id_val)
+    return obj
+
+
+def decode_json_packet(b: bytes):
+    return json.loads(b.decode("utf-8", errors="replace"))
+
+
+# ------------- Ingest -------------
+def publish(obj):
+    global latest
+    with latest_lock:
+        latest = obj
+    if sinks is not None:
+        sinks.submit(obj)
+    events = rules.evaluate(obj) if rules is not None else None
+    if stats is not None:
+        # last, and on its own, so a stats error can't cost the frame
+        try:
+            stats.add_frame(obj)
+        except Exception as e:
+            print(f"[{now_str()}] stats: frame skipped: {e}")
+    if events:
+        with alert_lock:
+            for ev in events:
+                key = (ev["rule"], ev["car"])
+                alert_pending.pop(key, None)    # re-insert: keeps the order events happened in
+                alert_pending[key] = ev
+
+
+def ingest(obj):
+    """Every decoded packet comes through here, from either listener."""
+    if jitter is not None and "time" in obj:
+        jitter.push(obj)
+        return
+    publish(obj)
+
+
+def jitter_releaser():
+    print(f"[{now_str()}] Jitter buffer on: +{JITTER_LATENCY_MS:.0f} ms, release @ {JITTER_RELEASE_HZ} Hz")
+    period = 1.0 / JITTER_RELEASE_HZ
+    last_log = time.time()
+    while True:
+        # take what falls due before the next wake-up and play each frame
+        # at its own time rather than in a burst
+        for play_at, obj in jitter.pop_ready(time.time() + period):
+            wait = play_at - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            publish(obj)
+        now = time.time()
+        if now - last_log >= 5.0:
+            last_log = now
+            s = jitter.snapshot()
+            print(f"[{now_str()}] jitter: rx={s['received']} out={s['released']} reordered={s['reordered']} "
+                  f"dup={s['duplicates']} late={s['late']} dropped={s['dropped']} interp={s['interpolated']}")
+        time.sleep(period)
 
 
 # ------------- UDP listeners (robust) -------------
@@ -108,10 +220,8 @@ def json_listener():
         try:
             data, _ = sock.recvfrom(65535)
             try:
-                obj = json.loads(data.decode("utf-8", errors="replace"))
-                with latest_lock:
-                    global latest
-                    latest = obj
+                obj = decode_json_packet(data)
+                ingest(obj)
             except Exception:
                 pass
         except Exception as e:
@@ -129,9 +239,7 @@ def bin_listener():
             data, _ = sock.recvfrom(65535)
             try:
                 obj = parse_outgauge_packet(data)
-                with latest_lock:
-                    global latest
-                    latest = obj
+                ingest(obj)
             except Exception:
                 pass
         except Exception as e:
@@ -140,35 +248,54 @@ def bin_listener():
 
 
 # ------------- SSE broadcaster (robust) -------------
+def build_sse_frame(payload: dict) -> bytes:
+    """Normalise a telemetry dict (modified in place) into one SSE frame."""
+    try:
+        payload["speed_kmh"] = float(payload.get("kmh", 0.0))
+        payload["speed_mph"] = float(payload.get("mph", 0.0))
+        payload["rpm"] = float(payload.get("rpm", 0.0))
+        payload["turbo"] = float(payload.get("turbo", 0.0))
+        payload["psi"] = float(payload.get("psi", 0.0))
+        payload["gear"] = int(payload.get("gear", 1))
+    except Exception:
+        pass
+    line = "data: " + json.dumps(payload, separators=(",", ":")) + "\n\n"
+    return line.encode("utf-8")
+
+
+def build_sse_event(name: str, payload: dict) -> bytes:
+    """A named SSE event; browsers get it with addEventListener(name, ...)."""
+    line = f"event: {name}\ndata: " + json.dumps(payload, separators=(",", ":")) + "\n\n"
+    return line.encode("utf-8")
+
+
+def broadcast_frame(encoded: bytes):
+    dead = []
+    with clients_lock:
+        for w in list(clients):
+            try:
+                w.write(encoded)
+                w.flush()
+            except Exception:
+                dead.append(w)
+        for w in dead:
+            clients.discard(w)
+
+
 def sse_broadcaster():
+    global alert_pending
     print(f"[{now_str()}] SSE broadcaster @ {BROADCAST_HZ} Hz")
     period = 1.0 / BROADCAST_HZ
     while True:
         start = time.time()
+        if alert_pending:
+            with alert_lock:
+                pending, alert_pending = alert_pending, {}
+            broadcast_frame(b"".join(build_sse_event("alert", ev) for ev in pending.values()))
         with latest_lock:
             payload = latest.copy() if latest is not None else None
         if payload is not None:
-            try:
-                payload["speed_kmh"] = float(payload.get("kmh", 0.0))
-                payload["speed_mph"] = float(payload.get("mph", 0.0))
-                payload["rpm"] = float(payload.get("rpm", 0.0))
-                payload["turbo"] = float(payload.get("turbo", 0.0))
-                payload["psi"] = float(payload.get("psi", 0.0))
-                payload["gear"] = int(payload.get("gear", 1))
-            except Exception:
-                pass
-            line = "data: " + json.dumps(payload, separators=(",", ":")) + "\n\n"
-            encoded = line.encode("utf-8")
-            dead = []
-            with clients_lock:
-                for w in list(clients):
-                    try:
-                        w.write(encoded)
-                        w.flush()
-                    except Exception:
-                        dead.append(w)
-                for w in dead:
-                    clients.discard(w)
+            broadcast_frame(build_sse_frame(payload))
         dt = time.time() - start
         time.sleep(max(0.0, period - dt))
 
@@ -195,13 +322,15 @@ html,body{height:100%;margin:0;background:var(--bg);color:var(--text);font-famil
 canvas{width:100%;height:auto;display:block}
 .readout{margin-top:6px;color:var(--muted);font-size:13px}
 .value{font-variant-numeric:tabular-nums;color:var(--text)}
+.alert{display:inline-block;margin-left:6px;padding:2px 8px;border-radius:999px;color:#05080c;font-weight:700}
+.alert.info{background:#7cd6ff}.alert.warn{background:#ffc857}.alert.alert{background:#ff5a5f}
 .badge{display:inline-block;padding:2px 8px;border-radius:999px;background:#0d1420;border:1px solid #1c2a40;color:var(--muted)}
 </style>
 </head>
 <body>
   <div class="header">
     <div class="brand">ErinsMod OutGauge Dashboard</div>
-    <div id="status">Waiting for data…</div>
+    <div><span id="alerts"></span> <span id="status">Waiting for data…</span></div>
   </div>
   <div class="grid">
     <div class="card">
@@ -334,6 +463,22 @@ es.onmessage = (e)=>{
   statusEl.textContent = `Car ${car} • Gear ${gearTxt} • ${Math.round(latest.rpm||0)} rpm`;
 };
 es.onerror = ()=>{ statusEl.textContent = "Disconnected. Retrying…"; };
+
+// server-side alert rules: only state changes arrive
+const alertsEl = document.getElementById('alerts');
+const activeAlerts = new Map();
+es.addEventListener('alert', (e)=>{
+  const a = JSON.parse(e.data);
+  const key = a.car + '/' + a.rule;
+  if(a.state === 'on') activeAlerts.set(key, a); else activeAlerts.delete(key);
+  alertsEl.replaceChildren(...[...activeAlerts.values()].map(x=>{
+    const el = document.createElement('span');
+    el.className = 'alert ' + x.level;
+    el.textContent = x.message || x.rule;
+    return el;
+  }));
+});
+es.addEventListener('open', ()=>{ activeAlerts.clear(); alertsEl.replaceChildren(); });
 </script>
 </body>
 </html>
@@ -344,6 +489,32 @@ class Handler(BaseHTTPRequestHandler):
     def log_message(self, fmt, *args):
         sys.stdout.write("%s - - [%s] %s\n" % (self.client_address[0], now_str(), fmt%args))
 
+    def _send_json(self, obj):
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self.send_response(404)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(b"Not found")
+
+    def do_POST(self):
+        # state-changing endpoints are POST-only, so a prefetch or a
+        # crawler following links can't trigger them
+        if self.path == "/stats/reset":
+            if stats is not None:
+                stats.reset()
+            self._send_json({"reset": stats is not None})
+            return
+
+        self._not_found()
+
     def do_GET(self):
         if self.path == "/" or self.path.startswith("/index.html"):
             body = INDEX_HTML.encode("utf-8")
@@ -355,18 +526,47 @@ class Handler(BaseHTTPRequestHandler):
             self.wfile.write(body)
             return
 
+        if self.path == "/jitter":
+            self._send_json(jitter.snapshot() if jitter is not None else {"enabled": False})
+            return
+
+        if self.path == "/stats":
+            self._send_json(stats.snapshot() if stats is not None else {"enabled": False})
+            return
+
+        if self.path == "/stats/reset":
+            self.send_response(405)
+            self.send_header("Allow", "POST")
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(b"Use POST")
+            return
+
+        if self.path == "/sinks":
+            self._send_json(sinks.snapshot() if sinks is not None else {"enabled": False})
+            return
+
+        if self.path == "/alerts":
+            self._send_json(rules.snapshot() if rules is not None else {"enabled": False})
+            return
+
         if self.path == "/stream":
             self.send_response(200)
             self.send_header("Content-Type", "text/event-stream")
             self.send_header("Cache-Control", "no-cache")
             self.send_header("Connection", "keep-alive")
             self.end_headers()
-            try:
-                self.wfile.write(b":ok\n\n")
-                self.wfile.flush()
-            except Exception:
-                return
+            # late joiners get whatever is already on. Taken under clients_lock,
+            # so an event broadcast before it is already in the snapshot and
+            # one broadcast after it reaches this client too.
             with clients_lock:
+                try:
+                    self.wfile.write(b":ok\n\n")
+                    for ev in (rules.active() if rules is not None else ()):
+                        self.wfile.write(build_sse_event("alert", {**ev, "state": "on"}))
+                    self.wfile.flush()
+                except Exception:
+                    return
                 clients.add(self.wfile)
             try:
                 while True:
@@ -378,10 +578,7 @@ class Handler(BaseHTTPRequestHandler):
                     clients.discard(self.wfile)
             return
 
-        self.send_response(404)
-        self.send_header("Content-Type", "text/plain; charset=utf-8")
-        self.end_headers()
-        self.wfile.write(b"Not found")
+        self._not_found()
 
 
 class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
@@ -394,10 +591,23 @@ def main():
     print(f"HTTP   : http://0.0.0.0:{HTTP_PORT}/  (open http://{lan_ip}:{HTTP_PORT}/ on your LAN)")
     print(f"LAN IP : {lan_ip}   {'(looks like your 192.168.1.* address)' if lan_ip.startswith('192.168.1.') else ''}")
     print(f"UDP In : {BIND_ADDR_UDP}:{JSON_PORT} (JSON), {BIND_ADDR_UDP}:{BIN_PORT} (binary)")
+    if stats is not None:
+        print(f"Stats  : http://{lan_ip}:{HTTP_PORT}/stats  (JSON, POST /stats/reset to clear)")
+    if rules is not None:
+        print(f"Alerts : {len(rules)} rules from {os.path.basename(RULES_FILE) if len(rules) else '(none)'}, "
+              f"http://{lan_ip}:{HTTP_PORT}/alerts")
+    for s in (sinks.sinks if sinks is not None else ()):
+        print(f"Sink   : {s.type_name} -> {s.target()}")
+    if JITTER_BUFFER and jitter is None:
+        print("Jitter : outgauge_jitter.py not found, buffer off")
     # Start listeners and broadcaster
     t1 = threading.Thread(target=json_listener, daemon=True); t1.start()
     t2 = threading.Thread(target=bin_listener, daemon=True); t2.start()
     t3 = threading.Thread(target=sse_broadcaster, daemon=True); t3.start()
+    if jitter is not None:
+        t4 = threading.Thread(target=jitter_releaser, daemon=True); t4.start()
+    if sinks is not None:
+        sinks.start()
 
     # HTTP server
     srv = ThreadingHTTPServer((BIND_ADDR_HTTP, HTTP_PORT), Handler)
@@ -407,6 +617,8 @@ def main():
         print("\nShutting down...")
     finally:
         srv.server_close()
+        if sinks is not None:
+            sinks.stop()
 
 
 if __name__ == "__main__":
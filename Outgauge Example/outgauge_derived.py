@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+ErinsMod OutGauge derived channels
+----------------------------------------------------
+Channels computed from the raw feed with NumPy, a whole chunk at a
+time: live batches from the Telemetry app's history, or a recorded
+session in bulk.
+
+    out = compute({"t": t, "kmh": kmh, "rpm": rpm, "gear": gear, ...})
+    out["g_long"], out["wheelspin_pct"], out["shift_rpm_drop"], ...
+
+Add your own with the @derived decorator; a channel can use any raw
+input or any derived channel registered before it.
+
+Wheelspin needs each gear's no-slip rpm/speed ratio, which is a
+statistic over the whole session. Live callers keep a GearRefs, feed it
+every sample once, and pass it in so a chunk gets the same values it
+would get from a bulk run over the session:
+
+    refs = GearRefs()
+    refs.add(rpm_per_kmh(rpm, kmh), gear)
+    out = compute(chunk, gear_refs=refs)
+
+Run on a recording (CSV with a header row, or NDJSON):
+    python outgauge_derived.py session.csv -o session_derived.csv
+----------------------------------------------------
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+G = 9.80665
+SMOOTH_N = 5                # samples in the speed moving average
+MIN_KMH = 10.0              # below this rpm/speed ratios are meaningless
+SLIP_REF_PCT = 10.0         # per-gear no-slip ratio = this percentile of rpm/km/h
+SLIP_BIN = 0.1              # rpm per km/h; resolution of that percentile
+SLIP_BINS = 4000            # ratios above SLIP_BIN * SLIP_BINS land in the top bin
+SLIP_MIN_SAMPLES = 3        # a gear needs this many samples for a reference
+SHIFT_WINDOW_S = 0.4        # look this far after a gear change for the rpm dip
+LIMITER_ON = 0.5
+
+# raw names used by the Telemetry history / OutGauge dicts -> canonical
+ALIASES = {"speed_kmh": "kmh", "speed_mph": "mph", "boost_psi": "psi"}
+
+CHANNELS = {}               # name -> DerivedChannel, in registration order
+
+
+class DerivedChannel:
+    def __init__(self, name, inputs, fn, units="", sparse=False):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.fn = fn
+        self.units = units
+        self.sparse = sparse    # NaN except at events
+
+
+def derived(name, inputs, units="", sparse=False):
+    """Registers fn(arrays) -> ndarray as derived channel `name`."""
+    def deco(fn):
+        CHANNELS[name] = DerivedChannel(name, inputs, fn, units, sparse)
+        return fn
+    return deco
+
+
+def prepare(data):
+    """Float arrays keyed by canonical name; fills in `speed` (m/s) and
+    `kmh` from whichever of the two is present."""
+    arrays = {}
+    for k, v in data.items():
+        arrays[ALIASES.get(k, k)] = np.asarray(v, dtype=float)
+    if "speed" not in arrays and "kmh" in arrays:
+        arrays["speed"] = arrays["kmh"] / 3.6
+    if "kmh" not in arrays and "speed" in arrays:
+        arrays["kmh"] = arrays["speed"] * 3.6
+    return arrays
+
+
+def compute(data, names=None, gear_refs=None):
+    """Computes every registered channel whose inputs are available.
+    `data` maps channel name -> equal-length array-like and must include
+    "t" (seconds, increasing). `gear_refs` (GearRefs) supplies the
+    per-gear wheelspin references; by default they come from `data`.
+    Returns {name: ndarray}."""
+    arrays = prepare(data)
+    out = {}
+    if len(arrays.get("t", ())) == 0:
+        return out
+    if gear_refs is not None:
+        arrays["gear_refs"] = gear_refs
+    for ch in CHANNELS.values():
+        if all(i in arrays for i in ch.inputs):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                arrays[ch.name] = out[ch.name] = ch.fn(arrays)
+    if names is not None:
+        out = {k: v for k, v in out.items() if k in names}
+    return out
+
+
+def _smooth(x, n=SMOOTH_N):
+    if n <= 1 or len(x) < n:
+        return x
+    pad = n // 2
+    xp = np.pad(x, (pad, n - 1 - pad), mode="edge")
+    return np.convolve(xp, np.ones(n) / n, mode="valid")
+
+
+def _onsets(mask):
+    """Indices where a boolean array goes False -> True."""
+    m = mask.astype(np.int8)
+    return np.flatnonzero(np.diff(m, prepend=m[:1]) > 0)
+
+
+def _gear_changes(gear):
+    return np.flatnonzero(np.diff(gear) != 0) + 1
+
+
+def rpm_per_kmh(rpm, kmh):
+    rpm, kmh = np.asarray(rpm, dtype=float), np.asarray(kmh, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(kmh > MIN_KMH, rpm / kmh, np.nan)
+
+
+class GearRefs:
+    """Per-gear no-slip rpm/(km/h) ratio: the SLIP_REF_PCT percentile of
+    every ratio added for the gear, from fixed-bin counts. It doesn't
+    depend on how the samples were split into chunks, so it can be
+    carried from one chunk to the next."""
+
+    def __init__(self):
+        self.counts = {}            # gear -> bin counts
+
+    def add(self, ratio, gear):
+        """Counts the finite ratios of driving gears (OutGauge gear >= 2).
+        Returns the gears whose reference changed."""
+        ratio, gear = np.asarray(ratio, dtype=float), np.asarray(gear, dtype=float)
+        m = np.isfinite(ratio) & (gear >= 2)
+        if not m.any():
+            return set()
+        bins = np.minimum((ratio[m] / SLIP_BIN).astype(np.intp), SLIP_BINS - 1)
+        gear = gear[m]
+        changed = set()
+        for g in np.unique(gear).tolist():
+            before = self.ref(g)
+            c = self.counts.setdefault(g, np.zeros(SLIP_BINS, dtype=np.int64))
+            c += np.bincount(bins[gear == g], minlength=SLIP_BINS)
+            if self.ref(g) != before:
+                changed.add(g)
+        return changed
+
+    def ref(self, gear):
+        """The gear's reference ratio, or None with too few samples."""
+        c = self.counts.get(gear)
+        if c is None:
+            return None
+        cum = np.cumsum(c)
+        if cum[-1] < SLIP_MIN_SAMPLES:
+            return None
+        rank = max(1, int(np.ceil(SLIP_REF_PCT / 100.0 * cum[-1])))
+        return (int(np.searchsorted(cum, rank)) + 0.5) * SLIP_BIN
+
+
+def wheelspin(ratio, gear, gear_refs):
+    """Percent by which rpm/speed exceeds the gear's no-slip ratio."""
+    ratio, gear = np.asarray(ratio, dtype=float), np.asarray(gear, dtype=float)
+    out = np.full(len(ratio), np.nan)
+    for g in np.unique(gear[gear >= 2]).tolist():
+        ref = gear_refs.ref(g)
+        if ref is not None:
+            m = gear == g
+            out[m] = (ratio[m] / ref - 1.0) * 100.0
+    return out
+
+
+# ------------- Built-in channels -------------
+@derived("accel_ms2", ("t", "speed"), units="m/s^2")
+def _accel(a):
+    t = a["t"]
+    if len(t) < 2:
+        return np.full(len(t), np.nan)
+    acc = np.gradient(_smooth(a["speed"]), t)
+    acc[~np.isfinite(acc)] = np.nan
+    return acc
+
+
+@derived("g_long", ("accel_ms2",), units="g")
+def _g_long(a):
+    return a["accel_ms2"] / G
+
+
+@derived("rpm_per_kmh", ("rpm", "kmh"))
+def _rpm_per_kmh(a):
+    return rpm_per_kmh(a["rpm"], a["kmh"])
+
+
+@derived("wheelspin_pct", ("rpm_per_kmh", "gear"), units="%")
+def _wheelspin(a):
+    # the no-slip rpm/speed ratio of a gear is near the low end of what's
+    # seen in it; anything above that is the driven wheels outrunning the car
+    refs = a.get("gear_refs")
+    if refs is None:
+        refs = GearRefs()
+        refs.add(a["rpm_per_kmh"], a["gear"])
+    return wheelspin(a["rpm_per_kmh"], a["gear"], refs)
+
+
+@derived("shift", ("gear",))
+def _shift(a):
+    out = np.zeros(len(a["gear"]))
+    out[_gear_changes(a["gear"])] = 1.0
+    return out
+
+
+@derived("shift_rpm_drop", ("t", "rpm", "gear"), units="rpm", sparse=True)
+def _shift_rpm_drop(a):
+    t, rpm = a["t"], a["rpm"]
+    n = len(t)
+    out = np.full(n, np.nan)
+    idx = _gear_changes(a["gear"])
+    if len(idx) == 0:
+        return out
+    end = np.minimum(np.searchsorted(t, t[idx] + SHIFT_WINDOW_S), n - 1)
+    end = np.maximum(end, idx + 1)
+    bounds = np.empty(2 * len(idx), dtype=np.intp)
+    bounds[0::2] = idx
+    bounds[1::2] = np.minimum(end, n - 1)
+    lowest = np.minimum.reduceat(rpm, bounds)[0::2]
+    out[idx] = rpm[idx - 1] - lowest
+    return out
+
+
+@derived("shift_interval_s", ("t", "gear"), units="s", sparse=True)
+def _shift_interval(a):
+    t = a["t"]
+    out = np.full(len(t), np.nan)
+    idx = _gear_changes(a["gear"])
+    if len(idx) > 1:
+        out[idx[1:]] = np.diff(t[idx])
+    return out
+
+
+@derived("limiter_hit", ("limiter",))
+def _limiter_hit(a):
+    out = np.zeros(len(a["limiter"]))
+    out[_onsets(a["limiter"] > LIMITER_ON)] = 1.0
+    return out
+
+
+# ------------- Recorded sessions -------------
+def load_session(path):
+    """Reads a CSV (header row) or NDJSON recording into {name: ndarray}.
+    Only numeric columns are kept."""
+    cols = {}
+    if path.endswith((".ndjson", ".jsonl", ".json")):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        keys = [k for k, v in rows[0].items() if isinstance(v, (int, float))] if rows else []
+        for k in keys:
+            cols[k] = np.array([r.get(k, np.nan) for r in rows], dtype=float)
+    else:
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            table = np.array(list(reader), dtype=object)
+        for i, k in enumerate(header):
+            try:
+                cols[k] = table[:, i].astype(float)
+            except (ValueError, IndexError):
+                pass
+    if "t" not in cols and "time" in cols:
+        cols["t"] = (cols["time"] - cols["time"][0]) / 1000.0
+    return cols
+
+
+def save_csv(path, columns):
+    """Writes {name: array} with a header row; floats are written in full
+    (shortest repr), so nothing is lost on a round trip."""
+    names = list(columns)
+    cols = [np.asarray(columns[k], dtype=float).tolist() for k in names]
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(names)
+        w.writerows(zip(*cols))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Add derived channels to a recorded OutGauge session.")
+    ap.add_argument("input", help="CSV with a header row, or NDJSON")
+    ap.add_argument("-o", "--output", default=None, help="output CSV (default <input>_derived.csv)")
+    args = ap.parse_args()
+
+    raw = load_session(args.input)
+    if "t" not in raw:
+        print("Input needs a 't' (seconds) or 'time' (ms) column")
+        sys.exit(1)
+    out = compute(raw)
+    out_path = args.output or args.input.rsplit(".", 1)[0] + "_derived.csv"
+    save_csv(out_path, {**raw, **out})
+    print(f"{len(raw['t'])} samples, derived: {', '.join(out)} -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+ErinsMod OutGauge frame helpers
+----------------------------------------------------
+Small helpers for the OutGauge dicts passed around by the other
+outgauge_*.py modules.
+
+    car_key(frame)                 # which car the frame is from
+----------------------------------------------------
+"""
+
+
+def car_key(frame):
+    """The car a frame belongs to: its "id", or "plid" when there's no id
+    (92-byte binary packets don't carry one), else 0."""
+    car = frame.get("id")
+    return car if car is not None else frame.get("plid", 0)
@@ -0,0 +1,247 @@
+"""
+ErinsMod OutGauge jitter buffer
+----------------------------------------------------
+Optional ingest stage shared by outgauge_dashboard.py and the
+Telemetry app. Packets are ordered by the sender's OutGauge `time`
+(ms) instead of arrival time, duplicates and late packets are
+dropped, short gaps are filled by interpolation, and frames come
+back out on the sender's own schedule plus a fixed added latency.
+
+    jb = JitterBank(latency_ms=100)
+    jb.push(frame)                 # any thread, frame has "time"
+    for play_at, frame in jb.pop_ready():
+        ...                        # play_at is local time.time()
+----------------------------------------------------
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+
+from outgauge_frame import car_key
+
+DEFAULT_LATENCY_MS = 100.0
+DEFAULT_MAX_INTERP_MS = 250.0   # longer gaps are reported but not filled
+DEFAULT_NOMINAL_MS = 1000.0 / 60.0
+OFFSET_WINDOW_S = 2.0           # clock offset = min(arrival - time) over this window
+RESET_MS = 5000.0               # sender clock going back this far = game restarted
+MAX_PENDING = 1000
+
+STAT_KEYS = (
+    "received", "released", "duplicates", "reordered", "late",
+    "gaps", "dropped", "interpolated", "overflow", "resets",
+)
+
+
+def _lerp_frame(a, b, frac, time_ms):
+    out = dict(a)
+    for k, va in a.items():
+        vb = b.get(k)
+        if type(va) is float and type(vb) in (float, int):
+            out[k] = va + (vb - va) * frac
+    out["time"] = int(time_ms)
+    return out
+
+
+class JitterBuffer:
+    """Jitter buffer for one sender (one car)."""
+
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, max_interp_ms=DEFAULT_MAX_INTERP_MS):
+        self.latency_ms = float(latency_ms)
+        self.max_interp_ms = float(max_interp_ms)
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._heap = []                 # (time_ms, seq, frame)
+        self._pending = set()           # time_ms values in the heap
+        self._seq = 0
+        self._highest = None            # highest sender time seen
+        self._last_out = None           # last released frame (real or filled)
+        self._last_real = None          # last released frame that was received
+        self._nominal_ms = None         # sender's packet interval
+        self._deltas = deque(maxlen=15)
+        self._offsets = deque()         # (arrival_s, offset_ms), min at the front
+
+    # ------------- clock offset -------------
+    def _note_offset(self, arrival_s, offset_ms):
+        # monotonic deque: the front is always the minimum over the window
+        q = self._offsets
+        while q and q[-1][1] >= offset_ms:
+            q.pop()
+        q.append((arrival_s, offset_ms))
+        while q[0][0] < arrival_s - OFFSET_WINDOW_S:
+            q.popleft()
+
+    @property
+    def offset_ms(self):
+        """Estimated (receiver wall clock ms) - (sender time ms)."""
+        return self._offsets[0][1] if self._offsets else None
+
+    def _nominal(self):
+        return self._nominal_ms or DEFAULT_NOMINAL_MS
+
+    # ------------- in -------------
+    def push(self, frame, arrival=None):
+        """Adds a frame (dict with "time" in ms). Returns False if it was
+        dropped as a duplicate or as too late to play."""
+        arrival = time.time() if arrival is None else arrival
+        t = float(frame["time"])
+        with self._lock:
+            st = self.stats
+            st["received"] += 1
+
+            if self._highest is not None and t < self._highest - RESET_MS:
+                self._reset_state()
+                st["resets"] += 1
+
+            if t in self._pending or (self._last_out is not None and t == self._last_out["time"]):
+                st["duplicates"] += 1
+                return False
+            if self._last_out is not None and t < self._last_out["time"]:
+                st["late"] += 1
+                return False
+
+            if self._highest is None or t > self._highest:
+                if self._highest is not None:
+                    # median of recent deltas: gaps and bursts don't move it
+                    self._deltas.append(t - self._highest)
+                    self._nominal_ms = sorted(self._deltas)[len(self._deltas) // 2]
+                self._highest = t
+            else:
+                st["reordered"] += 1
+
+            self._note_offset(arrival, arrival * 1000.0 - t)
+
+            heapq.heappush(self._heap, (t, self._seq, frame))
+            self._seq += 1
+            self._pending.add(t)
+            if len(self._heap) > MAX_PENDING:
+                old_t, _, _ = heapq.heappop(self._heap)
+                self._pending.discard(old_t)
+                st["overflow"] += 1
+            return True
+
+    # ------------- out -------------
+    def play_time(self, time_ms):
+        """Local time.time() at which sender time `time_ms` is played."""
+        off = self.offset_ms
+        if off is None:
+            return None
+        return (time_ms + off + self.latency_ms) / 1000.0
+
+    def _gap(self, a, b):
+        """(missing frames, spacing ms) between released frame `a` and
+        received frame `b`."""
+        nominal = self._nominal()
+        gap = b["time"] - a["time"]
+        if gap <= nominal * 1.5:
+            return 0, gap
+        missing = int(round(gap / nominal)) - 1
+        return missing, gap / (missing + 1)
+
+    def _fill(self, out, due_ms):
+        """Plays the interpolated frames due by `due_ms` that lie between
+        the last received frame and the next one waiting in the heap.
+        They come out one at a time, on their own slot, rather than in a
+        burst once the frame after the gap is due."""
+        a = self._last_real
+        if a is None or not self._heap:
+            return
+        b = self._heap[0][2]
+        missing, step = self._gap(a, b)
+        if missing <= 0 or b["time"] - a["time"] > self.max_interp_ms:
+            return
+        k = int(round((self._last_out["time"] - a["time"]) / step)) + 1
+        while k <= missing:
+            ti = a["time"] + step * k
+            if ti > due_ms:
+                break
+            frame = _lerp_frame(a, b, k / (missing + 1), ti)
+            out.append((self.play_time(ti), frame))
+            self.stats["interpolated"] += 1
+            self._last_out = frame
+            k += 1
+
+    def _release(self, out, frame):
+        st = self.stats
+        if self._last_real is not None:
+            missing, _ = self._gap(self._last_real, frame)
+            if missing > 0:
+                st["gaps"] += 1
+                st["dropped"] += missing
+        out.append((self.play_time(frame["time"]), frame))
+        st["released"] += 1
+        self._last_out = self._last_real = frame
+
+    def pop_ready(self, now=None):
+        """Returns [(play_at, frame), ...] due by `now`, oldest first."""
+        now = time.time() if now is None else now
+        out = []
+        with self._lock:
+            off = self.offset_ms
+            if off is None:
+                return out
+            due_ms = now * 1000.0 - off - self.latency_ms
+            while True:
+                self._fill(out, due_ms)
+                if not self._heap or self._heap[0][0] > due_ms:
+                    break
+                t, _, frame = heapq.heappop(self._heap)
+                self._pending.discard(t)
+                self._release(out, frame)
+        return out
+
+    def snapshot(self):
+        with self._lock:
+            d = dict(self.stats)
+            d["pending"] = len(self._heap)
+            d["offset_ms"] = self.offset_ms
+            d["interval_ms"] = self._nominal_ms
+            d["latency_ms"] = self.latency_ms
+        return d
+
+
+class JitterBank:
+    """One JitterBuffer per car, keyed on the frame's "id" (or "plid")."""
+
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, max_interp_ms=DEFAULT_MAX_INTERP_MS):
+        self.latency_ms = latency_ms
+        self.max_interp_ms = max_interp_ms
+        self.buffers = {}
+        self._lock = threading.Lock()
+
+    def _buffer(self, key):
+        jb = self.buffers.get(key)
+        if jb is None:
+            with self._lock:
+                jb = self.buffers.setdefault(key, JitterBuffer(self.latency_ms, self.max_interp_ms))
+        return jb
+
+    def push(self, frame, arrival=None):
+        key = car_key(frame)
+        return self._buffer(key).push(frame, arrival)
+
+    def pop_ready(self, now=None):
+        now = time.time() if now is None else now
+        out = []
+        for jb in list(self.buffers.values()):
+            out.extend(jb.pop_ready(now))
+        if len(self.buffers) > 1:
+            out.sort(key=lambda x: x[0])
+        return out
+
+    def snapshot(self):
+        total = dict.fromkeys(STAT_KEYS, 0)
+        total["pending"] = 0
+        cars = {}
+        for key, jb in list(self.buffers.items()):
+            s = jb.snapshot()
+            cars[str(key)] = s
+            for k in STAT_KEYS + ("pending",):
+                total[k] += s[k]
+        total["latency_ms"] = self.latency_ms
+        total["cars"] = cars
+        return total
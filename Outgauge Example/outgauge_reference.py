@@ -0,0 +1,129 @@
+"""
+ErinsMod OutGauge reference runs
+----------------------------------------------------
+A stored run indexed by distance (m), so a live run can be compared
+against it at the same point on track. Lookups are a binary search
+over the sorted distance column: O(log n) per call, cheap even for
+runs with hundreds of thousands of samples.
+
+    ref = ReferenceRun.from_csv("best_run.csv")
+    ref.time_at(1234.5)                 # s into the reference run
+    ref.value_at("speed_kmh", 1234.5)
+----------------------------------------------------
+"""
+
+import csv
+from bisect import bisect_left
+
+SPEED_KEYS = (("speed", 1.0), ("speed_kmh", 1 / 3.6), ("kmh", 1 / 3.6), ("speed_mph", 0.44704), ("mph", 0.44704))
+
+
+def integrate_distance(t, speed_ms, d0=0.0):
+    """Cumulative trapezoid of speed (m/s) over t (s); never decreases."""
+    dist = []
+    d = d0
+    prev_t = prev_v = None
+    for ti, vi in zip(t, speed_ms):
+        if prev_t is not None and ti > prev_t:
+            d += (prev_v + vi) * 0.5 * (ti - prev_t)
+        dist.append(d)
+        prev_t, prev_v = ti, vi
+    return dist
+
+
+def speed_ms(columns):
+    """Speed in m/s from whichever speed column is present, or None."""
+    for key, scale in SPEED_KEYS:
+        if key in columns:
+            return [float(v) * scale for v in columns[key]]
+    return None
+
+
+class ReferenceRun:
+    """`columns` maps name -> list of floats and needs "t" plus either
+    "dist" (m) or a speed column. Time and distance are re-based to 0."""
+
+    def __init__(self, columns, name=""):
+        t = [float(v) for v in columns["t"]]
+        if not t:
+            raise ValueError("reference run is empty")
+        if "dist" in columns:
+            dist = [float(v) for v in columns["dist"]]
+        else:
+            v = speed_ms(columns)
+            if v is None:
+                raise ValueError("reference run needs a 'dist' or speed column")
+            dist = integrate_distance(t, v)
+
+        t0, d0 = t[0], dist[0]
+        self.t = [x - t0 for x in t]
+        # bisect needs it sorted; clamp any tiny backwards steps
+        self.dist = []
+        hi = 0.0
+        for x in dist:
+            hi = max(hi, x - d0)
+            self.dist.append(hi)
+        self.channels = {
+            k: [float(x) for x in vals] for k, vals in columns.items() if k not in ("t", "dist")
+        }
+        self.name = name
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            cols = {k: [] for k in header}
+            for row in reader:
+                for k, v in zip(header, row):
+                    cols[k].append(v)
+        numeric = {}
+        for k, vals in cols.items():
+            try:
+                numeric[k] = [float(v) for v in vals]
+            except ValueError:
+                pass
+        return cls(numeric, name=path)
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def length_m(self):
+        return self.dist[-1]
+
+    @property
+    def duration_s(self):
+        return self.t[-1]
+
+    def locate(self, d):
+        """(i, frac): distance `d` lies frac of the way from sample i-1 to i."""
+        dist = self.dist
+        i = bisect_left(dist, d)
+        if i <= 0:
+            return 0, 1.0
+        if i >= len(dist):
+            return len(dist) - 1, 1.0
+        span = dist[i] - dist[i - 1]
+        return i, ((d - dist[i - 1]) / span) if span > 0 else 1.0
+
+    def _interp(self, col, d):
+        i, frac = self.locate(d)
+        if i == 0:
+            return col[0]
+        return col[i - 1] + (col[i] - col[i - 1]) * frac
+
+    def time_at(self, d):
+        """Reference time (s) at distance `d` (m)."""
+        return self._interp(self.t, d)
+
+    def value_at(self, channel, d):
+        return self._interp(self.channels[channel], d)
+
+    def sample(self, d, names):
+        """[time, *channels] at distance `d`, from a single search."""
+        i, frac = self.locate(d)
+        cols = [self.t] + [self.channels[k] for k in names]
+        if i == 0:
+            return [c[0] for c in cols]
+        return [c[i - 1] + (c[i] - c[i - 1]) * frac for c in cols]
@@ -0,0 +1,271 @@
+"""
+ErinsMod OutGauge alert rules
+----------------------------------------------------
+Threshold rules over the OutGauge feed (over-boost, shift point,
+limiter, pedal overlap, ...), evaluated server-side once per packet.
+Only state changes come out, as events.
+
+Rules are compiled once into a flat plan: every distinct condition is
+one entry, shared by all rules that use it, and each channel gets
+sorted tables of its conditions' on and off thresholds. A condition
+can only flip if its threshold lies between the channel's previous
+and current value, so a packet costs a binary search per channel plus
+the conditions that actually flip. Rules are only re-checked when one
+of their conditions flips or their min-duration timer is running, so
+hundreds of rules stay cheap.
+
+    engine = RuleEngine.from_file("outgauge_rules.json")
+    for event in engine.evaluate(frame):   # any thread, OutGauge dict
+        ...                                # {"rule", "state": "on"/"off", ...}
+
+Rule file (JSON):
+    {"rules": [
+      {"name": "over_boost", "channel": "psi", "op": ">", "value": 30,
+       "hysteresis": 2, "min_duration_ms": 300, "level": "warn"},
+      {"name": "pedal_overlap", "min_duration_ms": 200,
+       "all": [{"channel": "throttle", "op": ">", "value": 0.1},
+               {"channel": "brake", "op": ">", "value": 0.1}]}
+    ]}
+
+A ">" condition turns on above `value` and off again at or below
+`value - hysteresis`; "<" is the mirror image. A rule is on once all
+of its conditions have held for `min_duration_ms` (sender time).
+----------------------------------------------------
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from outgauge_frame import car_key
+
+OPS = (">", "<")
+LEVELS = ("info", "warn", "alert")
+
+
+class _Rule:
+    def __init__(self, name, terms, channels, min_ms, level, message):
+        self.name = name
+        self.terms = terms          # indices into the engine's term table
+        self.channels = channels    # (frame key, slot), for the event's values
+        self.min_ms = min_ms
+        self.level = level
+        self.message = message
+
+
+class _ChannelPlan:
+    """Sorted thresholds of one channel's conditions, split by direction,
+    with the matching term indices alongside."""
+
+    def __init__(self, terms, ids):
+        def table(gt, col):
+            rows = sorted((terms[i][col], i) for i in ids if terms[i][1] == gt)
+            return [r[0] for r in rows], [r[1] for r in rows]
+
+        self.ids = ids
+        self.gt_on, self.gt_on_ids = table(True, 2)
+        self.gt_off, self.gt_off_ids = table(True, 3)
+        self.lt_on, self.lt_on_ids = table(False, 2)
+        self.lt_off, self.lt_off_ids = table(False, 3)
+
+
+class _CarState:
+    def __init__(self, n_keys, n_terms, n_rules):
+        self.values = [None] * n_keys   # last value seen per channel
+        self.terms = [False] * n_terms
+        self.on = [False] * n_rules
+        self.pending = {}           # rule index -> ms its conditions started holding
+        self.last_time = None
+
+
+def _parse_condition(rule_name, cond, hysteresis=0.0):
+    try:
+        channel = str(cond["channel"])
+        op = cond.get("op", ">")
+        value = float(cond["value"])
+        hyst = float(cond.get("hysteresis", hysteresis))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"rule {rule_name!r}: bad condition {cond!r} ({e})")
+    if op not in OPS:
+        raise ValueError(f"rule {rule_name!r}: op must be one of {OPS}, not {op!r}")
+    if hyst < 0:
+        raise ValueError(f"rule {rule_name!r}: hysteresis must be >= 0")
+    off = value - hyst if op == ">" else value + hyst
+    return channel, op == ">", value, off
+
+
+class RuleEngine:
+    def __init__(self, rules=()):
+        self._lock = threading.Lock()
+        self.compile(rules)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            doc = json.load(f)
+        return cls(doc.get("rules", []) if isinstance(doc, dict) else doc)
+
+    def compile(self, rules):
+        """Builds the evaluation plan from a list of rule dicts. Raises
+        ValueError on a malformed rule; the previous plan is kept."""
+        keys, slots = [], {}
+        terms, term_ids = [], {}
+        compiled, names = [], set()
+
+        for spec in rules:
+            name = spec.get("name")
+            if not name or name in names:
+                raise ValueError(f"every rule needs a unique name ({name!r})")
+            names.add(name)
+            conds = spec.get("all") or [spec]
+            idx, channels = [], []
+            for cond in conds:
+                channel, gt, on, off = _parse_condition(name, cond, spec.get("hysteresis", 0.0))
+                if channel not in slots:
+                    slots[channel] = len(keys)
+                    keys.append(channel)
+                term = (slots[channel], gt, on, off)
+                if term not in term_ids:
+                    term_ids[term] = len(terms)
+                    terms.append(term)
+                idx.append(term_ids[term])
+                channels.append((channel, slots[channel]))
+            level = spec.get("level", "warn")
+            if level not in LEVELS:
+                raise ValueError(f"rule {name!r}: level must be one of {LEVELS}")
+            compiled.append(_Rule(name, tuple(idx), tuple(dict.fromkeys(channels)),
+                                  float(spec.get("min_duration_ms", 0.0)), level, spec.get("message", "")))
+
+        term_rules = [[] for _ in terms]
+        for r, rule in enumerate(compiled):
+            for i in rule.terms:
+                term_rules[i].append(r)
+        plan = [_ChannelPlan(terms, [i for i, term in enumerate(terms) if term[0] == slot])
+                for slot in range(len(keys))]
+
+        with self._lock:
+            self.keys = keys
+            self.terms = terms
+            self.rules = compiled
+            self._plan = plan
+            self._term_rules = [tuple(x) for x in term_rules]
+            self._cars = {}
+            self.packets = 0
+            self.events = 0
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _event(self, rule, state, car, now_ms, vals):
+        ev = {
+            "rule": rule.name,
+            "state": state,
+            "level": rule.level,
+            "car": car,
+            "time": int(now_ms),
+            "values": {k: vals[slot] for k, slot in rule.channels},
+        }
+        if rule.message:
+            ev["message"] = rule.message
+        return ev
+
+    def evaluate(self, frame, now_ms=None):
+        """Feeds one OutGauge dict; returns the events it caused (usually
+        none). A repeat of the car's previous `time` is skipped, since
+        CarX sends every frame on both the JSON and the binary port."""
+        if not self.terms:
+            return []
+        car = car_key(frame)
+        time_ms = frame.get("time")
+        with self._lock:
+            cs = self._cars.get(car)
+            if cs is None:
+                cs = self._cars[car] = _CarState(len(self.keys), len(self.terms), len(self.rules))
+            if time_ms is not None and time_ms == cs.last_time:
+                return []
+            cs.last_time = time_ms
+            self.packets += 1
+            if now_ms is None:
+                now_ms = float(time_ms) if time_ms is not None else time.time() * 1000.0
+
+            vals = [frame.get(k) for k in self.keys]
+            dirty = set(cs.pending)
+            for slot, v in enumerate(vals):
+                if v is not None and v != cs.values[slot]:
+                    self._step_channel(cs, slot, v, dirty)
+            if not dirty:
+                return []
+
+            events = []
+            for r in sorted(dirty):
+                rule = self.rules[r]
+                if all(cs.terms[i] for i in rule.terms):
+                    if cs.on[r]:
+                        continue
+                    start = cs.pending.setdefault(r, now_ms)
+                    if now_ms < start:          # sender clock went back
+                        start = cs.pending[r] = now_ms
+                    if now_ms - start >= rule.min_ms:
+                        del cs.pending[r]
+                        cs.on[r] = True
+                        events.append(self._event(rule, "on", car, now_ms, vals))
+                else:
+                    cs.pending.pop(r, None)
+                    if cs.on[r]:
+                        cs.on[r] = False
+                        events.append(self._event(rule, "off", car, now_ms, vals))
+            self.events += len(events)
+            return events
+
+    def _step_channel(self, cs, slot, v, dirty):
+        """Flips the conditions on channel `slot` whose on/off threshold the
+        value crossed since the last packet. A ">" condition that is off
+        has had value <= on, and one that is on has had value > off (the
+        mirror for "<"), so nothing outside the crossed range can flip."""
+        p = self._plan[slot]
+        v0 = cs.values[slot]
+        cs.values[slot] = v
+
+        if v0 is None:
+            for i in p.ids:
+                _, gt, on, _ = self.terms[i]
+                self._flip(cs, (i,), v > on if gt else v < on, dirty)
+        elif v > v0:
+            if p.gt_on:
+                self._flip(cs, p.gt_on_ids[bisect_left(p.gt_on, v0):bisect_left(p.gt_on, v)], True, dirty)
+            if p.lt_off:
+                self._flip(cs, p.lt_off_ids[bisect_right(p.lt_off, v0):bisect_right(p.lt_off, v)], False, dirty)
+        else:
+            if p.gt_off:
+                self._flip(cs, p.gt_off_ids[bisect_left(p.gt_off, v):bisect_left(p.gt_off, v0)], False, dirty)
+            if p.lt_on:
+                self._flip(cs, p.lt_on_ids[bisect_right(p.lt_on, v):bisect_right(p.lt_on, v0)], True, dirty)
+
+    def _flip(self, cs, ids, state, dirty):
+        states = cs.terms
+        for i in ids:
+            if states[i] != state:
+                states[i] = state
+                dirty.update(self._term_rules[i])
+
+    def active(self):
+        """[{"rule", "level", "car", "message"}, ...] for every rule currently on."""
+        with self._lock:
+            return [
+                {"rule": rule.name, "level": rule.level, "car": car, "message": rule.message}
+                for car, cs in self._cars.items()
+                for rule, on in zip(self.rules, cs.on) if on
+            ]
+
+    def snapshot(self):
+        active = self.active()
+        with self._lock:
+            return {
+                "rules": len(self.rules),
+                "conditions": len(self.terms),
+                "channels": list(self.keys),
+                "packets": self.packets,
+                "events": self.events,
+                "active": active,
+            }
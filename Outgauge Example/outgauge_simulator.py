@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+ErinsMod OutGauge Simulator
+----------------------------------------------------
+Fakes the ErinsMod OutGauge feed so the dashboard and the
+Telemetry app can be tested without CarX running.
+Run:
+    python outgauge_simulator.py
+    python outgauge_simulator.py --cars 4 --json-hz 60 --bin-hz 60
+    python outgauge_simulator.py --bin-size 92     # binary packets without the ID
+    python outgauge_simulator.py --host 192.168.1.20 --duration 300
+Stop:
+    Ctrl+C
+----------------------------------------------------
+"""
+
+import argparse
+import json
+import math
+import random
+import socket
+import struct
+import threading
+import time
+
+from outgauge_dashboard import _BASE_FMT, JSON_PORT, BIN_PORT
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_HZ = 60.0
+BIN_SIZES = (92, 96)    # binary packet without / with the trailing ID
+
+CAR_NAMES = ("ERX", "S13", "S15", "JZX", "FD3", "E36", "AE8", "R34")
+
+
+def now_str():
+    return time.strftime("%H:%M:%S", time.localtime())
+
+
+# ------------- Simulated car -------------
+class SimCar:
+    """Very rough longitudinal model: a drive cycle of full-throttle pulls
+    through the gears, a hard stop, and a part-throttle cruise, with noise.
+    Good enough for plausible rpm/speed/pedal/boost waveforms."""
+
+    GEAR_RATIOS = (3.60, 2.20, 1.52, 1.15, 0.92, 0.78)
+    FINAL_DRIVE = 3.9
+    WHEEL_RADIUS = 0.33     # m
+    IDLE_RPM = 900.0
+    SHIFT_RPM = 7600.0
+    LIMIT_RPM = 8000.0
+    DOWNSHIFT_RPM = 3200.0
+    MAX_BOOST_BAR = 1.4
+    CYCLE_S = 32.0
+    SHIFT_S = 0.25
+
+    def __init__(self, idx=0, seed=None):
+        self.idx = idx
+        self.car = CAR_NAMES[idx % len(CAR_NAMES)]
+        self.plid = idx & 0xFF
+        self.rng = random.Random(seed if seed is not None else idx)
+        self.phase = self.rng.uniform(0.0, self.CYCLE_S)
+        self.power = self.rng.uniform(0.8, 1.2)
+
+        self.speed = 0.0        # m/s
+        self.rpm = self.IDLE_RPM
+        self.gear = 1           # 1..6, 0 = neutral
+        self.boost = 0.0        # bar
+        self.throttle = 0.0
+        self.brake = 0.0
+        self.clutch = 0.0
+        self.limiter = 0
+        self._shift_left = 0.0
+
+    def _pedal_targets(self, t):
+        c = (t + self.phase) % self.CYCLE_S
+        if c < 14.0:            # pull through the gears
+            return 1.0, 0.0
+        if c < 18.0:            # hard stop
+            return 0.0, 0.85
+        if c < 26.0:            # part-throttle cruise, wobbling
+            return 0.35 + 0.15 * math.sin(c * 2.1), 0.0
+        if c < 28.0:            # lift and trail brake
+            return 0.0, 0.3
+        return 0.6, 0.0         # roll back on
+
+    def _wheel_rpm(self, gear):
+        ratio = self.GEAR_RATIOS[gear - 1] * self.FINAL_DRIVE
+        return self.speed / (2.0 * math.pi * self.WHEEL_RADIUS) * 60.0 * ratio
+
+    def step(self, t, dt):
+        thr_t, brk_t = self._pedal_targets(t)
+        # pedals are moved by a human-ish foot, not a step function
+        k = min(1.0, dt * 12.0)
+        self.throttle += (thr_t - self.throttle) * k
+        self.brake += (brk_t - self.brake) * k
+        self.throttle = min(1.0, max(0.0, self.throttle + self.rng.gauss(0.0, 0.005)))
+        self.brake = min(1.0, max(0.0, self.brake))
+
+        # gear changes
+        if self._shift_left > 0.0:
+            self._shift_left -= dt
+            self.clutch = 1.0
+            drive = 0.0
+        else:
+            self.clutch = max(0.0, self.clutch - dt * 8.0)
+            drive = self.throttle
+            if self.gear < len(self.GEAR_RATIOS) and self.rpm >= self.SHIFT_RPM:
+                self.gear += 1
+                self._shift_left = self.SHIFT_S
+            elif self.gear > 1 and self.rpm < self.DOWNSHIFT_RPM and self.throttle < 0.2:
+                self.gear -= 1
+                self._shift_left = self.SHIFT_S * 0.6
+
+        # boost follows throttle and rpm with lag
+        boost_t = self.MAX_BOOST_BAR * drive * min(1.0, self.rpm / 5000.0)
+        self.boost += (boost_t - self.boost) * min(1.0, dt * 3.0)
+
+        # longitudinal accel (m/s^2)
+        torque = 0.6 + 0.4 * (self.boost / self.MAX_BOOST_BAR)
+        accel = drive * torque * self.power * 9.0 * (self.GEAR_RATIOS[self.gear - 1] / self.GEAR_RATIOS[0]) ** 0.7
+        accel -= self.brake * 10.0
+        accel -= 0.0004 * self.speed * self.speed + 0.15
+        self.speed = max(0.0, self.speed + accel * dt)
+
+        wheel_rpm = self._wheel_rpm(self.gear)
+        self.limiter = 0
+        if wheel_rpm >= self.LIMIT_RPM:
+            # bouncing off the limiter: cap speed for this gear
+            self.limiter = 1
+            wheel_rpm = self.LIMIT_RPM - self.rng.uniform(0.0, 150.0)
+            self.speed *= 0.999
+        target_rpm = max(self.IDLE_RPM, wheel_rpm)
+        if self.clutch > 0.5:
+            # rpm falls towards the next gear during the shift
+            self.rpm += (target_rpm - self.rpm) * min(1.0, dt * 10.0)
+        else:
+            self.rpm = target_rpm
+        self.rpm += self.rng.gauss(0.0, 8.0)
+
+    def state(self, time_ms):
+        bar = self.boost
+        return {
+            "time": int(time_ms) & 0xFFFFFFFF,
+            "car": self.car,
+            "flags": 0,
+            "gear": self.gear + 1,      # OutGauge: 0=R, 1=N, 2=1st
+            "plid": self.plid,
+            "speed": self.speed,
+            "kmh": self.speed * 3.6,
+            "mph": self.speed * 2.2369363,
+            "rpm": self.rpm,
+            "turbo": bar,
+            "bar": bar,
+            "psi": bar * 14.503774,
+            "limiter": float(self.limiter),
+            "throttle": self.throttle,
+            "brake": self.brake,
+            "clutch": self.clutch,
+            "id": self.idx,
+        }
+
+
+# ------------- Packet encoding -------------
+def encode_json(state):
+    return json.dumps(state, separators=(",", ":")).encode("utf-8")
+
+
+def encode_bin(state, with_id=True):
+    b = struct.pack(
+        _BASE_FMT,
+        state["time"],
+        state["car"].encode("ascii", errors="ignore")[:3].ljust(4, b"\x00"),
+        state["flags"], state["gear"], state["plid"],
+        state["speed"], state["kmh"], state["mph"], state["rpm"],
+        state["turbo"], state["bar"], state["psi"],
+        int(state["limiter"]), 0,
+        state["throttle"], state["brake"], state["clutch"],
+        b"", b"",
+    )
+    if with_id:
+        b += struct.pack("<i", state["id"])
+    return b
+
+
+# ------------- Sender -------------
+class Simulator:
+    """Steps `cars` cars and sends JSON and/or binary packets for each of
+    them at the given rates. `time` in every packet is ms since `wall0`,
+    so receivers on the same host can turn it back into a send time.
+    `sent_frames` counts distinct (car, time) frames, however many ports
+    each one went out on."""
+
+    def __init__(self, host=DEFAULT_HOST, cars=1, json_hz=DEFAULT_HZ, bin_hz=0.0,
+                 json_port=JSON_PORT, bin_port=BIN_PORT, seed=None, bin_size=96):
+        if bin_size not in BIN_SIZES:
+            raise ValueError(f"bin_size must be one of {BIN_SIZES}, not {bin_size!r}")
+        self.host = host
+        self.bin_size = bin_size
+        self.json_hz = float(json_hz)
+        self.bin_hz = float(bin_hz)
+        self.json_port = json_port
+        self.bin_port = bin_port
+        self.cars = [SimCar(i, None if seed is None else seed + i) for i in range(max(1, cars))]
+        self.sent_json = 0
+        self.sent_bin = 0
+        self.sent_frames = 0
+        self.send_errors = 0
+        self.wall0 = time.time()
+        self.stop_event = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, data, port):
+        try:
+            self._sock.sendto(data, (self.host, port))
+            return True
+        except OSError:
+            self.send_errors += 1
+            return False
+
+    def run(self, duration=0.0):
+        """Blocks until `duration` seconds pass (0 = forever) or stop()."""
+        rates = [r for r in (self.json_hz, self.bin_hz) if r > 0]
+        if not rates:
+            return
+        step = 1.0 / max(rates)
+        next_json = next_bin = t0 = time.perf_counter()
+        self.wall0 = time.time()
+        last_t = 0.0
+
+        while not self.stop_event.is_set():
+            now = time.perf_counter()
+            t = now - t0
+            if duration and t >= duration:
+                break
+
+            dt = t - last_t
+            if dt > 0.0:
+                for car in self.cars:
+                    car.step(t, min(dt, 0.1))
+                last_t = t
+
+            time_ms = t * 1000.0
+            sent = set()
+            if self.json_hz > 0 and now >= next_json:
+                for car in self.cars:
+                    if self._send(encode_json(car.state(time_ms)), self.json_port):
+                        self.sent_json += 1
+                        sent.add(car.idx)
+                next_json += 1.0 / self.json_hz
+                if now - next_json > 1.0:     # fell badly behind, don't burst
+                    next_json = now
+            if self.bin_hz > 0 and now >= next_bin:
+                for car in self.cars:
+                    if self._send(encode_bin(car.state(time_ms), with_id=self.bin_size == 96), self.bin_port):
+                        self.sent_bin += 1
+                        sent.add(car.idx)
+                next_bin += 1.0 / self.bin_hz
+                if now - next_bin > 1.0:
+                    next_bin = now
+            self.sent_frames += len(sent)
+
+            due = min(n for n, r in ((next_json, self.json_hz), (next_bin, self.bin_hz)) if r > 0)
+            wait = min(step, due - time.perf_counter())
+            if wait > 0:
+                time.sleep(wait)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def close(self):
+        self._sock.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Send fake ErinsMod OutGauge packets.")
+    ap.add_argument("--host", default=DEFAULT_HOST, help="destination address (default %(default)s)")
+    ap.add_argument("--cars", type=int, default=1, help="number of simulated cars")
+    ap.add_argument("--json-hz", type=float, default=DEFAULT_HZ, help="JSON packets per second per car (0 = off)")
+    ap.add_argument("--bin-hz", type=float, default=DEFAULT_HZ, help="binary packets per second per car (0 = off)")
+    ap.add_argument("--json-port", type=int, default=JSON_PORT)
+    ap.add_argument("--bin-port", type=int, default=BIN_PORT)
+    ap.add_argument("--bin-size", type=int, choices=BIN_SIZES, default=96,
+                    help="binary packet size: 96 carries the car ID, 92 doesn't (default %(default)s)")
+    ap.add_argument("--duration", type=float, default=0.0, help="seconds to run (0 = until Ctrl+C)")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    sim = Simulator(
+        host=args.host, cars=args.cars, json_hz=args.json_hz, bin_hz=args.bin_hz,
+        json_port=args.json_port, bin_port=args.bin_port, seed=args.seed, bin_size=args.bin_size,
+    )
+    print("=== ErinsMod OutGauge Simulator ===")
+    print(f"Cars   : {len(sim.cars)} ({', '.join(c.car for c in sim.cars)})")
+    print(f"JSON   : {args.host}:{args.json_port} @ {args.json_hz:g} Hz/car")
+    print(f"Binary : {args.host}:{args.bin_port} @ {args.bin_hz:g} Hz/car, {args.bin_size} bytes")
+
+    t = threading.Thread(target=sim.run, args=(args.duration,), daemon=True)
+    t.start()
+    last_json = last_bin = 0
+    try:
+        while t.is_alive():
+            t.join(1.0)
+            print(f"[{now_str()}] json/s={sim.sent_json - last_json} bin/s={sim.sent_bin - last_bin} "
+                  f"total_json={sim.sent_json} total_bin={sim.sent_bin} errors={sim.send_errors}")
+            last_json, last_bin = sim.sent_json, sim.sent_bin
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        sim.stop()
+        t.join(2.0)
+    finally:
+        sim.close()
+
+
+if __name__ == "__main__":
+    main()
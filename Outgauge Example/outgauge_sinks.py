@@ -0,0 +1,423 @@
+"""
+ErinsMod OutGauge output sinks
+----------------------------------------------------
+Extra destinations for the frames the dashboard and the Telemetry app
+publish: CSV and NDJSON files, OSC over UDP, and a local TCP socket.
+
+Every sink has its own writer thread fed from a bounded queue, and
+writes in batches. submit() never blocks: when a sink falls behind, its
+queue fills and new frames are dropped (and counted) instead of
+holding up the UDP listeners or the UI loop.
+
+    sinks = SinkSet.from_specs([
+        {"type": "csv", "path": "session_%Y%m%d_%H%M%S.csv"},
+        {"type": "osc", "host": "127.0.0.1", "port": 9000},
+    ])
+    sinks.start()
+    sinks.submit(frame)             # any thread, OutGauge dict
+    sinks.snapshot()                # per-sink throughput, queue, drops
+    sinks.stop()                    # flushes what's queued
+
+Add your own by subclassing Sink (write_batch, plus open/close if
+needed) and registering it with @sink_type("name").
+----------------------------------------------------
+"""
+
+import csv
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+from outgauge_frame import car_key
+
+DEFAULT_MAX_QUEUE = 4096        # frames waiting per sink before drops start
+DEFAULT_BATCH = 256             # most frames per write
+DEFAULT_FLUSH_S = 0.25          # longest a frame waits for its batch to fill
+IDLE_S = 0.25                   # writer wake-up period with nothing queued
+RATE_WINDOW_S = 1.0
+RECONNECT_S = 2.0               # TCP: wait this long between connect attempts
+
+SINK_TYPES = {}                 # "csv" -> CsvSink, ...
+
+
+def sink_type(name):
+    """Registers a Sink subclass for SinkSet.from_specs({"type": name})."""
+    def deco(cls):
+        SINK_TYPES[name] = cls
+        cls.type_name = name
+        return cls
+    return deco
+
+
+class Sink:
+    """Batched, threaded writer. Subclasses implement write_batch(frames)
+    and may return the number of bytes written; open() and close() run
+    on the writer thread."""
+
+    type_name = "sink"
+    flush_s = DEFAULT_FLUSH_S
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE, batch=DEFAULT_BATCH, flush_s=None):
+        self.batch = int(batch)
+        if flush_s is not None:
+            self.flush_s = float(flush_s)
+        self.max_queue = int(max_queue)
+        self._q = queue.Queue(maxsize=self.max_queue)
+        self._halt = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()   # dropped is counted from any submitting thread
+
+        self.dropped = 0            # queue full
+        self.written = 0
+        self.failed = 0             # frames in batches that failed to write
+        self.errors = 0
+        self.batches = 0
+        self.bytes = 0
+        self.rate_fps = 0.0
+        self.last_error = ""
+
+    def target(self):
+        """Where the frames go, for display."""
+        return ""
+
+    def open(self):
+        pass
+
+    def write_batch(self, frames):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # ------------- producer side -------------
+    def submit(self, frame):
+        """Queues a frame; False if the queue was full and it was dropped."""
+        try:
+            self._q.put_nowait(frame)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    # ------------- writer thread -------------
+    def start(self):
+        if self._thread is None:
+            self._halt.clear()
+            self._thread = threading.Thread(target=self._run, name=f"sink-{self.type_name}", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stops the writer after it has written what's already queued."""
+        if self._thread is not None:
+            self._halt.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _take(self):
+        """Up to `batch` frames, waiting at most flush_s after the first."""
+        try:
+            batch = [self._q.get(timeout=IDLE_S)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_s
+        while len(batch) < self.batch:
+            try:
+                wait = deadline - time.time()
+                batch.append(self._q.get(timeout=wait) if wait > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _fail(self, e, frames=0):
+        self.errors += 1
+        self.failed += frames
+        self.last_error = f"{type(e).__name__}: {e}"
+
+    def _run(self):
+        try:
+            self.open()
+        except Exception as e:
+            self._fail(e)
+        rate_t0, rate_n = time.time(), self.written
+        while True:
+            batch = self._take()
+            if batch:
+                try:
+                    n = self.write_batch(batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.bytes += n or 0
+                except Exception as e:
+                    self._fail(e, len(batch))
+            now = time.time()
+            if now - rate_t0 >= RATE_WINDOW_S:
+                self.rate_fps = (self.written - rate_n) / (now - rate_t0)
+                rate_t0, rate_n = now, self.written
+            if not batch and self._halt.is_set():
+                break
+        try:
+            self.close()
+        except Exception as e:
+            self._fail(e)
+
+    @property
+    def queue_depth(self):
+        return self._q.qsize()
+
+    def snapshot(self):
+        return {
+            "type": self.type_name,
+            "target": self.target(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "batches": self.batches,
+            "bytes": self.bytes,
+            "queue": self.queue_depth,
+            "max_queue": self.max_queue,
+            "rate_fps": round(self.rate_fps, 1),
+            "last_error": self.last_error,
+        }
+
+
+def _ndjson(frames):
+    return "".join(json.dumps(f, separators=(",", ":")) + "\n" for f in frames).encode("utf-8")
+
+
+# ------------- Files -------------
+class _FileSink(Sink):
+    """`path` goes through time.strftime, so "run_%H%M%S.csv" gives a
+    fresh file per start."""
+
+    def __init__(self, path, **kw):
+        super().__init__(**kw)
+        self.path = time.strftime(path)
+        self._f = None
+
+    def target(self):
+        return self.path
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+@sink_type("csv")
+class CsvSink(_FileSink):
+    """Columns are fixed by the first frame (or `columns`); keys that
+    turn up later are left out."""
+
+    def __init__(self, path="erinsmod_%Y%m%d_%H%M%S.csv", columns=None, **kw):
+        super().__init__(path, **kw)
+        self.columns = list(columns) if columns else None
+        self._w = None
+
+    def open(self):
+        self._f = open(self.path, "w", newline="")
+
+    def write_batch(self, frames):
+        if self._w is None:
+            self.columns = self.columns or list(frames[0])
+            self._w = csv.DictWriter(self._f, self.columns, extrasaction="ignore")
+            self._w.writeheader()
+        start = self._f.tell()
+        self._w.writerows(frames)
+        self._f.flush()
+        return self._f.tell() - start
+
+
+@sink_type("ndjson")
+class NdjsonSink(_FileSink):
+    def __init__(self, path="erinsmod_%Y%m%d_%H%M%S.ndjson", **kw):
+        super().__init__(path, **kw)
+
+    def open(self):
+        self._f = open(self.path, "wb")
+
+    def write_batch(self, frames):
+        data = _ndjson(frames)
+        self._f.write(data)
+        self._f.flush()
+        return len(data)
+
+
+# ------------- Network -------------
+OSC_CHANNELS = ("rpm", "kmh", "mph", "psi", "throttle", "brake", "clutch", "gear", "limiter")
+_OSC_IMMEDIATE = struct.pack(">Q", 1)
+
+
+def _osc_str(s):
+    b = s.encode("utf-8") + b"\x00"
+    return b + b"\x00" * (-len(b) % 4)
+
+
+def osc_message(address, *args):
+    """Encodes an OSC 1.0 message; ints go as i, floats as f, str as s."""
+    tags, data = ",", b""
+    for a in args:
+        if isinstance(a, int):
+            tags += "i"
+            data += struct.pack(">i", int(a))
+        elif isinstance(a, float):
+            tags += "f"
+            data += struct.pack(">f", a)
+        else:
+            tags += "s"
+            data += _osc_str(str(a))
+    return _osc_str(address) + _osc_str(tags) + data
+
+
+def osc_bundle(messages):
+    out = b"#bundle\x00" + _OSC_IMMEDIATE
+    for m in messages:
+        out += struct.pack(">i", len(m)) + m
+    return out
+
+
+@sink_type("osc")
+class OscSink(Sink):
+    """One OSC bundle per frame, one message per channel:
+    /outgauge/rpm 5400.0, /outgauge/gear 3, ..."""
+
+    flush_s = 0.0               # live consumers: send what's queued right away
+
+    def __init__(self, host="127.0.0.1", port=9000, prefix="/outgauge", channels=OSC_CHANNELS, **kw):
+        super().__init__(**kw)
+        self.addr = (host, int(port))
+        self.prefix = prefix.rstrip("/")
+        self.channels = tuple(channels)
+        self._sock = None
+
+    def target(self):
+        return f"udp://{self.addr[0]}:{self.addr[1]}{self.prefix}"
+
+    def open(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write_batch(self, frames):
+        n = 0
+        for f in frames:
+            msgs = [osc_message(f"{self.prefix}/{k}", f[k]) for k in self.channels if k in f]
+            if msgs:
+                n += self._sock.sendto(osc_bundle(msgs), self.addr)
+        return n
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+@sink_type("tcp")
+class TcpSink(Sink):
+    """NDJSON over a TCP connection to a local consumer. Reconnects every
+    RECONNECT_S while the consumer is away; batches in the meantime are
+    counted as failed."""
+
+    flush_s = 0.0
+
+    def __init__(self, host="127.0.0.1", port=9100, timeout_s=2.0, **kw):
+        super().__init__(**kw)
+        self.addr = (host, int(port))
+        self.timeout_s = float(timeout_s)
+        self._sock = None
+        self._retry_at = 0.0
+
+    def target(self):
+        return f"tcp://{self.addr[0]}:{self.addr[1]}"
+
+    def _connect(self):
+        if time.time() < self._retry_at:
+            raise ConnectionError("not connected")
+        try:
+            self._sock = socket.create_connection(self.addr, timeout=self.timeout_s)
+        except OSError:
+            self._retry_at = time.time() + RECONNECT_S
+            raise
+
+    def write_batch(self, frames):
+        if self._sock is None:
+            self._connect()
+        data = _ndjson(frames)
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            self._retry_at = time.time() + RECONNECT_S
+            raise
+        return len(data)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+# ------------- Fan-out -------------
+class SinkSet:
+    """Hands each frame to every sink. A repeat of a car's previous `time`
+    is skipped, since CarX sends every frame on both ports. Sinks share
+    the frame dict, so nothing may modify it after submit(). Safe to call
+    from several threads (the JSON and binary listeners)."""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self._last_time = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_specs(cls, specs):
+        """[{"type": "csv", "path": ...}, ...] -> SinkSet. Keys other than
+        "type" go to the sink's constructor."""
+        sinks = []
+        for spec in specs:
+            spec = dict(spec)
+            kind = spec.pop("type", None)
+            if kind not in SINK_TYPES:
+                raise ValueError(f"unknown sink type {kind!r} (have {', '.join(SINK_TYPES)})")
+            sinks.append(SINK_TYPES[kind](**spec))
+        return cls(sinks)
+
+    def __len__(self):
+        return len(self.sinks)
+
+    def start(self):
+        for s in self.sinks:
+            s.start()
+
+    def stop(self):
+        for s in self.sinks:
+            s.stop()
+
+    def submit(self, frame):
+        t = frame.get("time")
+        car = car_key(frame)
+        # the dedupe check and the hand-off are one step: the same frame
+        # arriving on both ports at once goes out once, and every sink
+        # sees frames in the same order
+        with self._lock:
+            if t is not None:
+                if self._last_time.get(car) == t:
+                    return
+                self._last_time[car] = t
+            for s in self.sinks:
+                s.submit(frame)
+
+    def snapshot(self):
+        return [s.snapshot() for s in self.sinks]
+
+    def summary(self):
+        """One short line for a status bar."""
+        return " | ".join(
+            f"{s.type_name} {s.rate_fps:.0f}/s q{s.queue_depth} drop {s.dropped + s.failed}"
+            for s in self.sinks
+        )
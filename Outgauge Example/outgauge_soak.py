@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+ErinsMod OutGauge Dashboard Soak Test
+----------------------------------------------------
+Starts outgauge_dashboard.py, feeds it simulated OutGauge traffic,
+attaches N SSE clients (some deliberately slow) and reports UDP and
+SSE frame loss, end-to-end latency, and server CPU / memory. Localhost
+only.
+Run:
+    python outgauge_soak.py --duration 60
+    python outgauge_soak.py --duration 0 --clients 20 --slow-clients 5
+    python outgauge_soak.py --no-spawn        # dashboard already running
+Stop:
+    Ctrl+C (a final report is still printed)
+----------------------------------------------------
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import outgauge_dashboard as dash
+from outgauge_simulator import BIN_SIZES, Simulator, now_str
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD_PY = os.path.join(HERE, "outgauge_dashboard.py")
+
+
+# ------------- Latency histogram -------------
+class LatencyHist:
+    """Fixed 0.1 ms buckets up to MAX_MS, so memory stays flat no matter
+    how long the soak runs."""
+
+    BUCKET_MS = 0.1
+    MAX_MS = 10000.0
+
+    def __init__(self):
+        self.counts = [0] * (int(self.MAX_MS / self.BUCKET_MS) + 1)
+        self.n = 0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        ms = max(0.0, ms)
+        self.counts[min(len(self.counts) - 1, int(ms / self.BUCKET_MS))] += 1
+        self.n += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.n += other.n
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, pct):
+        if self.n == 0:
+            return None
+        rank = max(1, int(round(pct / 100.0 * self.n)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return (i + 0.5) * self.BUCKET_MS
+        return self.max_ms
+
+
+# ------------- SSE client -------------
+class SSEClient(threading.Thread):
+    """Reads /stream over a raw socket. Slow clients read tiny chunks with a
+    pause in between and a small receive buffer, so they back up quickly."""
+
+    def __init__(self, idx, port, wall0, slow=False, slow_delay=0.2):
+        super().__init__(daemon=True)
+        self.idx = idx
+        self.port = port
+        self.wall0 = wall0
+        self.slow = slow
+        self.slow_delay = slow_delay
+        self.frames = 0
+        self.stale = 0
+        self.bad = 0
+        self.disconnects = 0
+        self.hist = LatencyHist()
+        self.connected_s = 0.0
+        self._connected_at = None
+        self._last_time = None
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def _connect(self):
+        s = socket.create_connection(("127.0.0.1", self.port), timeout=5.0)
+        if self.slow:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        s.sendall(b"GET /stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+        return s
+
+    def _on_line(self, line):
+        if not line.startswith(b"data: "):
+            return
+        now = time.time()
+        try:
+            obj = json.loads(line[6:])
+            t_ms = int(obj["time"])
+        except Exception:
+            self.bad += 1
+            return
+        self.frames += 1
+        if t_ms == self._last_time:
+            self.stale += 1
+        self._last_time = t_ms
+        self.hist.add((now - (self.wall0() + t_ms / 1000.0)) * 1000.0)
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                s = self._connect()
+            except OSError:
+                time.sleep(0.5)
+                continue
+            self._connected_at = time.time()
+            buf = b""
+            try:
+                while not self._halt.is_set():
+                    chunk = s.recv(256 if self.slow else 65536)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    *lines, buf = buf.split(b"\n")
+                    for line in lines:
+                        self._on_line(line.rstrip(b"\r"))
+                    if self.slow:
+                        time.sleep(self.slow_delay)
+            except OSError:
+                pass
+            finally:
+                self.connected_s += time.time() - self._connected_at
+                self._connected_at = None
+                s.close()
+            if not self._halt.is_set():
+                self.disconnects += 1
+
+    def connected_time(self):
+        extra = time.time() - self._connected_at if self._connected_at else 0.0
+        return self.connected_s + extra
+
+
+# ------------- Server resource sampling -------------
+def _proc_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _proc_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU % and RSS of `pid` once per `period`. Uses psutil when
+    installed, /proc otherwise; reports nothing if neither works."""
+
+    def __init__(self, pid, period=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.period = period
+        self.cpu = []
+        self.rss = []
+        self.available = True
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def run(self):
+        try:
+            if psutil is not None:
+                p = psutil.Process(self.pid)
+                p.cpu_percent(None)
+                read = lambda: (p.cpu_percent(None), p.memory_info().rss / (1024.0 * 1024.0))
+            else:
+                last = [_proc_cpu_seconds(self.pid), time.perf_counter()]
+
+                def read():
+                    cpu_s, now = _proc_cpu_seconds(self.pid), time.perf_counter()
+                    pct = 100.0 * (cpu_s - last[0]) / max(1e-6, now - last[1])
+                    last[:] = [cpu_s, now]
+                    return pct, _proc_rss_mb(self.pid)
+        except Exception:
+            self.available = False
+            return
+
+        while not self._halt.wait(self.period):
+            try:
+                cpu, rss = read()
+            except Exception:
+                break
+            self.cpu.append(cpu)
+            self.rss.append(rss)
+
+
+# ------------- Harness -------------
+def _wait_for_http(port, timeout=10.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _stats_frames(port):
+    """Frames the dashboard has received so far (/stats), or None."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=2.0) as r:
+            return int(json.load(r)["frames"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _fmt_ms(v):
+    return "n/a" if v is None else f"{v:.1f}"
+
+
+def build_report(sim, clients, sampler, elapsed, frames0=None):
+    report = {"duration_s": round(elapsed, 2), "broadcast_hz": dash.BROADCAST_HZ,
+              "udp_sent": {"json": sim.sent_json, "bin": sim.sent_bin, "errors": sim.send_errors}}
+
+    # frames the simulator sent vs. frames the dashboard took in; a frame sent
+    # on both ports counts once on each side
+    received = _stats_frames(dash.HTTP_PORT)
+    if frames0 is not None and received is not None:
+        received -= frames0
+        report["udp_loss"] = {
+            "frames_sent": sim.sent_frames,
+            "frames_received": received,
+            "loss_pct": round(100.0 * max(0.0, 1.0 - received / sim.sent_frames), 2) if sim.sent_frames else None,
+        }
+
+    for kind, group in (("fast", [c for c in clients if not c.slow]), ("slow", [c for c in clients if c.slow])):
+        if not group:
+            continue
+        hist = LatencyHist()
+        for c in group:
+            hist.merge(c.hist)
+        frames = sum(c.frames for c in group)
+        exp = sum(c.connected_time() for c in group) * dash.BROADCAST_HZ
+        report[f"{kind}_clients"] = {
+            "count": len(group),
+            "frames": frames,
+            "frames_expected": int(exp),
+            "frame_loss_pct": round(100.0 * max(0.0, 1.0 - frames / exp), 2) if exp else None,
+            "stale_frames": sum(c.stale for c in group),
+            "bad_frames": sum(c.bad for c in group),
+            "disconnects": sum(c.disconnects for c in group),
+            "latency_ms": {
+                "p50": hist.percentile(50), "p95": hist.percentile(95),
+                "p99": hist.percentile(99), "max": hist.max_ms if hist.n else None,
+            },
+        }
+
+    if sampler is not None and sampler.available and sampler.cpu:
+        report["server"] = {
+            "cpu_pct_avg": round(sum(sampler.cpu) / len(sampler.cpu), 1),
+            "cpu_pct_max": round(max(sampler.cpu), 1),
+            "rss_mb_avg": round(sum(sampler.rss) / len(sampler.rss), 1),
+            "rss_mb_max": round(max(sampler.rss), 1),
+            "rss_mb_growth": round(sampler.rss[-1] - sampler.rss[0], 1),
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n=== Soak report ({report['duration_s']:.0f}s) ===")
+    u = report["udp_sent"]
+    print(f"UDP sent    : json={u['json']} bin={u['bin']} errors={u['errors']}")
+    loss = report.get("udp_loss")
+    if loss:
+        print(f"UDP loss    : received {loss['frames_received']}/{loss['frames_sent']} frames, "
+              f"loss={loss['loss_pct']}%")
+    else:
+        print("UDP loss    : n/a (/stats not reachable)")
+    for kind in ("fast", "slow"):
+        r = report.get(f"{kind}_clients")
+        if not r:
+            continue
+        lat = r["latency_ms"]
+        print(f"{kind:<5} x{r['count']:<4}: frames={r['frames']}/{r['frames_expected']} "
+              f"loss={r['frame_loss_pct']}% stale={r['stale_frames']} disconnects={r['disconnects']}")
+        print(f"             latency ms p50={_fmt_ms(lat['p50'])} p95={_fmt_ms(lat['p95'])} "
+              f"p99={_fmt_ms(lat['p99'])} max={_fmt_ms(lat['max'])}")
+    s = report.get("server")
+    if s:
+        print(f"Server      : cpu avg={s['cpu_pct_avg']}% max={s['cpu_pct_max']}% | "
+              f"rss avg={s['rss_mb_avg']}MB max={s['rss_mb_max']}MB growth={s['rss_mb_growth']}MB")
+    else:
+        print("Server      : cpu/memory not available (use a spawned dashboard or --pid)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Soak test outgauge_dashboard.py on localhost.")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds to run (0 = until Ctrl+C)")
+    ap.add_argument("--clients", type=int, default=8, help="normal SSE clients")
+    ap.add_argument("--slow-clients", type=int, default=2, help="SSE clients that read slowly")
+    ap.add_argument("--slow-delay", type=float, default=0.2, help="pause between reads for slow clients (s)")
+    ap.add_argument("--cars", type=int, default=1)
+    ap.add_argument("--json-hz", type=float, default=60.0)
+    ap.add_argument("--bin-hz", type=float, default=0.0)
+    ap.add_argument("--bin-size", type=int, choices=BIN_SIZES, default=96, help="binary packet size")
+    ap.add_argument("--no-spawn", action="store_true", help="use a dashboard that is already running")
+    ap.add_argument("--pid", type=int, default=None, help="pid to sample when using --no-spawn")
+    ap.add_argument("--report-every", type=float, default=10.0, help="interim report period (s, 0 = off)")
+    ap.add_argument("--json-out", default=None, help="write the final report to this file")
+    args = ap.parse_args()
+
+    proc = None
+    if not args.no_spawn:
+        proc = subprocess.Popen([sys.executable, DASHBOARD_PY], cwd=HERE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not _wait_for_http(dash.HTTP_PORT):
+        print(f"Dashboard not reachable on port {dash.HTTP_PORT}")
+        if proc:
+            proc.kill()
+        sys.exit(1)
+
+    frames0 = _stats_frames(dash.HTTP_PORT)
+    sim = Simulator(host=dash.BIND_ADDR_UDP, cars=args.cars, json_hz=args.json_hz, bin_hz=args.bin_hz,
+                    bin_size=args.bin_size)
+    sim_thread = threading.Thread(target=sim.run, daemon=True)
+    sim_thread.start()
+
+    pid = proc.pid if proc else args.pid
+    sampler = ResourceSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+
+    wall0 = lambda: sim.wall0
+    clients = [SSEClient(i, dash.HTTP_PORT, wall0) for i in range(args.clients)]
+    clients += [SSEClient(args.clients + i, dash.HTTP_PORT, wall0, slow=True, slow_delay=args.slow_delay)
+                for i in range(args.slow_clients)]
+    for c in clients:
+        c.start()
+
+    print(f"[{now_str()}] soak running: {args.clients} clients + {args.slow_clients} slow, "
+          f"{args.cars} car(s) @ json {args.json_hz:g} Hz / bin {args.bin_hz:g} Hz")
+    t0 = time.time()
+    last_report = t0
+    try:
+        while not args.duration or time.time() - t0 < args.duration:
+            time.sleep(0.5)
+            if proc and proc.poll() is not None:
+                print(f"[{now_str()}] dashboard exited with code {proc.returncode}")
+                break
+            if args.report_every and time.time() - last_report >= args.report_every:
+                last_report = time.time()
+                print_report(build_report(sim, clients, sampler, last_report - t0, frames0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.time() - t0
+        sim.stop()
+        for c in clients:
+            c.stop()
+        if sampler:
+            sampler.stop()
+        time.sleep(0.2)     # let in-flight packets land before reading /stats
+        report = build_report(sim, clients, sampler, elapsed, frames0)
+        print_report(report)
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(report, f, indent=2)
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(5.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        sim.close()
+
+
+if __name__ == "__main__":
+    main()
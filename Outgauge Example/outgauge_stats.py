@@ -0,0 +1,255 @@
+"""
+ErinsMod OutGauge streaming stats
+----------------------------------------------------
+Incremental session analytics, shared by outgauge_dashboard.py and
+the Telemetry app. Every sample costs O(1) and memory is bounded:
+
+- per channel: running min/max/mean and percentiles for the whole
+  session, plus the same over a sliding time window
+- per session: peak boost, max speed, time on the limiter, and
+  throttle/brake overlap time
+
+All of it is kept per car (the frame's "id", or "plid"), so several
+cars on one feed don't mix.
+
+    stats = SessionStats()
+    stats.add_frame(frame)          # any thread, OutGauge dict
+    stats.snapshot()                # JSON-friendly dict
+----------------------------------------------------
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+from outgauge_frame import car_key
+
+DEFAULT_WINDOW_S = 30.0
+MAX_WINDOW_SAMPLES = 4096       # hard cap on samples kept for the window
+HIST_BINS = 256
+MAX_DT_S = 0.5                  # longer pauses don't count toward durations
+
+LIMITER_ON = 0.5                # `limiter` above this = on the limiter
+OVERLAP_ON = 0.1                # throttle and brake both above this = overlap
+
+# name: (frame key, histogram low, histogram high)
+CHANNELS = {
+    "rpm": ("rpm", 0.0, 12000.0),
+    "speed_kmh": ("kmh", 0.0, 400.0),
+    "boost_psi": ("psi", -15.0, 45.0),
+    "throttle": ("throttle", 0.0, 1.0),
+    "brake": ("brake", 0.0, 1.0),
+    "clutch": ("clutch", 0.0, 1.0),
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+class _Hist:
+    """Fixed-bin histogram: O(1) add/remove, O(bins) percentile. Values
+    outside [lo, hi] land in the end bins."""
+
+    def __init__(self, lo, hi, bins=HIST_BINS):
+        self.lo = lo
+        self.width = (hi - lo) / bins
+        self.counts = [0] * bins
+        self.n = 0
+
+    def index(self, v):
+        i = int((v - self.lo) / self.width)
+        return 0 if i < 0 else (len(self.counts) - 1 if i >= len(self.counts) else i)
+
+    def percentile(self, pct):
+        if self.n == 0:
+            return None
+        rank = max(1, int(math.ceil(pct / 100.0 * self.n)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.lo + (i + 0.5) * self.width
+        return None
+
+
+class ChannelStats:
+    """Running and sliding-window stats for one channel."""
+
+    def __init__(self, lo, hi, window_s=DEFAULT_WINDOW_S, max_window=MAX_WINDOW_SAMPLES):
+        self.window_s = window_s
+        self.max_window = max_window
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._hist = _Hist(lo, hi)
+
+        self._win = deque()             # (t, v, bin, seq)
+        self._win_sum = 0.0
+        self._win_hist = _Hist(lo, hi)
+        self._win_min = deque()         # (seq, v), increasing v
+        self._win_max = deque()         # (seq, v), decreasing v
+
+    def add(self, t, v):
+        self.n += 1
+        if self.min is None or v < self.min:
+            self.min = v
+        if self.max is None or v > self.max:
+            self.max = v
+        self.mean += (v - self.mean) / self.n
+        b = self._hist.index(v)
+        self._hist.counts[b] += 1
+        self._hist.n += 1
+
+        seq = self.n
+        self._win.append((t, v, b, seq))
+        self._win_sum += v
+        self._win_hist.counts[b] += 1
+        self._win_hist.n += 1
+        while self._win_min and self._win_min[-1][1] >= v:
+            self._win_min.pop()
+        self._win_min.append((seq, v))
+        while self._win_max and self._win_max[-1][1] <= v:
+            self._win_max.pop()
+        self._win_max.append((seq, v))
+        self._expire(t)
+
+    def _expire(self, now):
+        cutoff = now - self.window_s
+        win = self._win
+        while win and (win[0][0] < cutoff or len(win) > self.max_window):
+            _, v, b, seq = win.popleft()
+            self._win_sum -= v
+            self._win_hist.counts[b] -= 1
+            self._win_hist.n -= 1
+            if self._win_min and self._win_min[0][0] == seq:
+                self._win_min.popleft()
+            if self._win_max and self._win_max[0][0] == seq:
+                self._win_max.popleft()
+
+    def snapshot(self):
+        win_n = len(self._win)
+        d = {
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean if self.n else None,
+            "window": {
+                "seconds": self.window_s,
+                "n": win_n,
+                "min": self._win_min[0][1] if self._win_min else None,
+                "max": self._win_max[0][1] if self._win_max else None,
+                "mean": self._win_sum / win_n if win_n else None,
+            },
+        }
+        for p in PERCENTILES:
+            d[f"p{p}"] = self._hist.percentile(p)
+            d["window"][f"p{p}"] = self._win_hist.percentile(p)
+        return d
+
+
+def _num(v, default=None):
+    """`v` as a finite float, else `default`. JSON lets NaN and Infinity
+    through, and either would poison a mean or a histogram bin."""
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return default
+    return v if math.isfinite(v) else default
+
+
+class _CarSession:
+    """Channel stats and session totals for one car."""
+
+    def __init__(self, window_s):
+        self.channels = {name: ChannelStats(lo, hi, window_s) for name, (_, lo, hi) in CHANNELS.items()}
+        self.frames = 0
+        self.limiter_s = 0.0
+        self.limiter_hits = 0
+        self.overlap_s = 0.0
+        self._last_t = None
+        self._last_time_ms = None
+        self._on_limiter = False
+
+    def add(self, frame, t):
+        time_ms = frame.get("time")
+        if time_ms is not None and time_ms == self._last_time_ms:
+            return False
+        self._last_time_ms = time_ms
+        self.frames += 1
+        for name, (key, _, _) in CHANNELS.items():
+            v = _num(frame.get(key))
+            if v is not None:
+                self.channels[name].add(t, v)
+
+        dt = 0.0
+        if self._last_t is not None:
+            dt = min(MAX_DT_S, max(0.0, t - self._last_t))
+        self._last_t = t
+
+        on_limiter = _num(frame.get("limiter"), 0.0) > LIMITER_ON
+        if on_limiter:
+            self.limiter_s += dt
+            if not self._on_limiter:
+                self.limiter_hits += 1
+        self._on_limiter = on_limiter
+        if _num(frame.get("throttle"), 0.0) > OVERLAP_ON and _num(frame.get("brake"), 0.0) > OVERLAP_ON:
+            self.overlap_s += dt
+        return True
+
+    def snapshot(self):
+        chans = {name: cs.snapshot() for name, cs in self.channels.items()}
+        return {
+            "frames": self.frames,
+            "peak_boost_psi": chans["boost_psi"]["max"],
+            "max_speed_kmh": chans["speed_kmh"]["max"],
+            "max_rpm": chans["rpm"]["max"],
+            "limiter_s": self.limiter_s,
+            "limiter_hits": self.limiter_hits,
+            "pedal_overlap_s": self.overlap_s,
+            "channels": chans,
+        }
+
+
+class SessionStats:
+    """Stats for every channel in CHANNELS plus session totals, per car.
+    snapshot() puts the car heard from last at the top level, next to
+    the frame count over all cars, and every car under "cars"."""
+
+    def __init__(self, window_s=DEFAULT_WINDOW_S):
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.cars = {}
+            self.started = time.time()
+            self.frames = 0
+            self._current = None
+
+    def add_frame(self, frame, t=None):
+        """Feeds one OutGauge dict; `t` defaults to now (seconds). A repeat
+        of the car's previous `time` is skipped, since CarX sends every
+        frame on both the JSON and the binary port."""
+        t = time.time() if t is None else t
+        car = car_key(frame)
+        with self._lock:
+            cs = self.cars.get(car)
+            if cs is None:
+                cs = self.cars[car] = _CarSession(self.window_s)
+            if cs.add(frame, t):
+                self.frames += 1
+                self._current = car
+
+    def snapshot(self):
+        with self._lock:
+            cars = {str(car): cs.snapshot() for car, cs in self.cars.items()}
+            current = cars.get(str(self._current)) or _CarSession(self.window_s).snapshot()
+            return {
+                "session_s": time.time() - self.started,
+                **current,
+                "frames": self.frames,
+                "car": self._current,
+                "cars": cars,
+            }